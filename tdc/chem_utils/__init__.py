@@ -11,5 +11,8 @@ from .oracle.oracle import PyScreener_meta, Vina_3d, Score_3d, Vina_smiles, mole
 					mestranol_similarity, celecoxib_rediscovery, \
 					troglitazone_rediscovery, thiothixene_rediscovery, \
 					median_meta, isomer_meta, rediscovery_meta, similarity_meta, \
-					jnk3, gsk3b, SA, cyp3a4_veith, drd2, qed, penalized_logp
+					jnk3, gsk3b, SA, cyp3a4_veith, drd2, qed, penalized_logp, \
+					score_many, clear_oracle_caches, drd2_batch, gsk3b_batch, \
+					score_smiles_parallel, deco_hop_batch, scaffold_hop_batch, valsartan_smarts_batch, \
+					askcos_batch, ibm_rxn_batch
 from .oracle.filter import MolFilter
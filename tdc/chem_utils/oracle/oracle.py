@@ -6,9 +6,11 @@ import pickle
 import numpy as np 
 import os.path as op
 from abc import abstractmethod
-from functools import partial
+from functools import partial, lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import List
-import time, os, math, re
+import time, os, math, re, threading, json
+import urllib3
 from packaging import version
 import pkg_resources
 
@@ -21,7 +23,6 @@ try:
   from rdkit import rdBase
   rdBase.DisableLog('rdApp.error')
   from rdkit.Chem import rdMolDescriptors
-  from rdkit.six import iteritems
 except:
   raise ImportError("Please install rdkit by 'conda install -c conda-forge rdkit'! ")	
 
@@ -37,13 +38,41 @@ except:
 
 from ...utils import oracle_load
 from ...utils import print_sys, install
+from ...utils.query import _cache_get, _cache_put
+
+# askcos servers are queried with verify=False, silence the per-request warning once
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+def _gmean_small(values):
+  """Geometric mean of a short sequence of scores, without scipy's array overhead.
+
+  Args:
+    values: list of float
+
+  Returns:
+    float, 0.0 if any value is zero, nan if any is negative (as scipy's gmean)
+  """
+  if len(values) > 32:
+    return gmean(values)
+  lowest = min(values)
+  if lowest <= 0:
+    return 0.0 if lowest == 0 else math.nan
+  return math.exp(sum(math.log(v) for v in values) / len(values))
 
 mean2func = {
-  'geometric': gmean, 
+  'geometric': _gmean_small, 
   'arithmetic': np.mean, 
 }
 SKLEARN_VERSION = version.parse(pkg_resources.get_distribution("scikit-learn").version)
 
+# SMILES-keyed memoization of fingerprints, PHCO fingerprints and descriptors, optimization loops re-score 
+# the same molecules. Each of these caches holds up to ORACLE_CACHE_SIZE entries of a few KB, so a long run 
+# can keep several hundred MB alive; call clear_oracle_caches() to release them. 
+ORACLE_CACHE_SIZE = 100000
+# parsed mols take ~30KB each and only need to be shared by the oracles scoring one molecule, 
+# everything derived from them is memoized above
+MOL_CACHE_SIZE = 2048
+
 
 def smiles_to_rdkit_mol(smiles):
   """Convert smiles into rdkit's mol (molecule) format. 
@@ -51,18 +80,161 @@ def smiles_to_rdkit_mol(smiles):
   Args: 
     smiles: str, SMILES string. 
 
+  Returns:
+    mol: rdkit.Chem.rdchem.Mol, None if the SMILES string is invalid.
+
+  """
+  # MolFromSmiles already sanitizes and returns None on invalid valence
+  return Chem.MolFromSmiles(smiles)
+
+@lru_cache(maxsize=MOL_CACHE_SIZE)
+def _cached_mol(smiles):
+  # shared between oracle calls, which only read it, callers outside the oracles get a fresh mol
+  return smiles_to_rdkit_mol(smiles)
+
+def _to_mol(smiles_or_mol):
+  """Return an rdkit mol, parsing the input only when it is a SMILES string. 
+
+  Args: 
+    smiles_or_mol: str or rdkit.Chem.rdchem.Mol
+
   Returns:
     mol: rdkit.Chem.rdchem.Mol
 
   """
-  mol = Chem.MolFromSmiles(smiles)
-  #  Sanitization check (detects invalid valence)
-  if mol is not None:
-    try:
-      Chem.SanitizeMol(mol)
-    except ValueError:
-      return None
-  return mol
+  if isinstance(smiles_or_mol, Chem.Mol):
+    return smiles_or_mol
+  return _cached_mol(smiles_or_mol)
+
+def _parse_batch(smiles_list):
+  """Parse a list of SMILES strings once, None for those that fail to parse or sanitize. 
+  """
+  return [smiles_to_rdkit_mol(smiles) for smiles in smiles_list]
+
+def score_many(smiles_list, oracles):
+  """Score a list of SMILES strings with several oracles, parsing each molecule only once. 
+
+  Args: 
+    smiles_list: list of SMILES strings. 
+    oracles: dict mapping a name to an oracle function accepting an rdkit mol, 
+      e.g., {'qed': qed, 'SA': SA, 'drd2': drd2}. 
+
+  Returns:
+    scores: dict mapping each name to its list of scores, None for invalid SMILES. 
+
+  """
+  mols = _parse_batch(smiles_list)
+  return {name: [None if mol is None else oracle(mol) for mol in mols] for name, oracle in oracles.items()}
+
+# oracle resolved once per worker process by _init_parallel_worker
+_worker_oracle = None
+
+def _init_parallel_worker(oracle_name):
+  global _worker_oracle
+  oracle = globals()[oracle_name]
+  if isinstance(oracle, type):
+    oracle = oracle()
+  # an empty batch loads the classifier models before the first chunk arrives
+  if hasattr(oracle, 'batch'):
+    oracle.batch([])
+  _worker_oracle = oracle
+
+def _score_chunk(smiles_chunk):
+  if hasattr(_worker_oracle, 'batch'):
+    return list(_worker_oracle.batch(smiles_chunk))
+  return [_worker_oracle(smiles) for smiles in smiles_chunk]
+
+def score_smiles_parallel(smiles_list, oracle_name, n_jobs=-1, chunksize=1000):
+  """Score a list of SMILES strings with one oracle across worker processes. 
+
+  Only SMILES strings cross process boundaries, each worker parses its own molecules, 
+  loads the oracle's models once and scores whole chunks through the oracle's batch method when it has one. 
+  Model files are read from the oracle/ directory, so the oracle has to be downloaded beforehand, e.g., via tdc.Oracle. 
+
+  Args: 
+    smiles_list: list of SMILES strings. 
+    oracle_name: str, name of an oracle function or class in this module, e.g., 'drd2', 'jnk3', 'qed'. 
+    n_jobs: int, number of worker processes, -1 for one per CPU. 
+    chunksize: int, number of SMILES strings sent to a worker at a time. 
+
+  Returns:
+    scores: list of scores, in the order of smiles_list. 
+
+  """
+  if n_jobs is None or n_jobs < 1:
+    n_jobs = os.cpu_count() or 1
+  chunks = [smiles_list[i:i + chunksize] for i in range(0, len(smiles_list), chunksize)]
+  scores = []
+  with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_parallel_worker, initargs=(oracle_name,)) as executor:
+    for chunk_scores in executor.map(_score_chunk, chunks):
+      scores.extend(chunk_scores)
+  return scores
+
+# Morgan generators are built once and reused, older RDKit releases fall back to GetMorganFingerprint
+try:
+  from rdkit.Chem import rdFingerprintGenerator
+  _ECFP4_GEN = rdFingerprintGenerator.GetMorganGenerator(radius=2)
+  _FCFP4_GEN = rdFingerprintGenerator.GetMorganGenerator(radius=2, 
+      atomInvariantsGenerator=rdFingerprintGenerator.GetMorganFeatureAtomInvGen())
+  _ECFP6_GEN = rdFingerprintGenerator.GetMorganGenerator(radius=3)
+except (ImportError, AttributeError):
+  _ECFP4_GEN = _FCFP4_GEN = _ECFP6_GEN = None
+
+def _fp_ecfp4_from_mol(mol):
+  if _ECFP4_GEN is None:
+    return AllChem.GetMorganFingerprint(mol, 2)
+  return _ECFP4_GEN.GetSparseCountFingerprint(mol)
+
+def _fp_fcfp4_from_mol(mol):
+  if _FCFP4_GEN is None:
+    return AllChem.GetMorganFingerprint(mol, 2, useFeatures=True)
+  return _FCFP4_GEN.GetSparseCountFingerprint(mol)
+
+def _fp_ap_from_mol(mol):
+  return AllChem.GetAtomPairFingerprint(mol, maxLength=10)
+
+def _fp_ecfp6_from_mol(mol):
+  if _ECFP6_GEN is None:
+    return AllChem.GetMorganFingerprint(mol, 3)
+  return _ECFP6_GEN.GetSparseCountFingerprint(mol)
+
+def _fp_ecfp4_bits_from_mol(mol):
+  return AllChem.GetMorganFingerprintAsBitVect(mol, 2, nBits=2048)
+
+def _fp_fcfp4_bits_from_mol(mol):
+  return AllChem.GetMorganFingerprintAsBitVect(mol, 2, nBits=2048, useFeatures=True)
+
+def _fp_ap_bits_from_mol(mol):
+  return rdMolDescriptors.GetHashedAtomPairFingerprintAsBitVect(mol, nBits=2048, maxLength=10)
+
+def _fp_ecfp6_bits_from_mol(mol):
+  return AllChem.GetMorganFingerprintAsBitVect(mol, 3, nBits=2048)
+
+_fp_from_mol = {'ECFP4': _fp_ecfp4_from_mol, 
+                'FCFP4': _fp_fcfp4_from_mol, 
+                'AP': _fp_ap_from_mol, 
+                'ECFP6': _fp_ecfp6_from_mol, 
+                'ECFP4_bits': _fp_ecfp4_bits_from_mol, 
+                'FCFP4_bits': _fp_fcfp4_bits_from_mol, 
+                'AP_bits': _fp_ap_bits_from_mol, 
+                'ECFP6_bits': _fp_ecfp6_bits_from_mol
+}
+
+@lru_cache(maxsize=ORACLE_CACHE_SIZE)
+def _cached_fingerprint(fp_name, smiles):
+  return _fp_from_mol[fp_name](_cached_mol(smiles))
+
+def _fingerprint(fp_name, smiles_or_mol):
+  """Fingerprint of a molecule, memoized on the SMILES string when one is given. 
+  """
+  if isinstance(smiles_or_mol, str):
+    return _cached_fingerprint(fp_name, smiles_or_mol)
+  return _fp_from_mol[fp_name](smiles_or_mol)
+
+def _fresh_fingerprint(fp_name, smiles):
+  # the public helpers hand out a new fingerprint, callers may modify it in place
+  molecule = smiles if isinstance(smiles, Chem.Mol) else smiles_to_rdkit_mol(smiles)
+  return _fp_from_mol[fp_name](molecule)
 
 def smiles_2_fingerprint_ECFP4(smiles):
   """Convert smiles into ECFP4 Morgan Fingerprint. 
@@ -71,12 +243,10 @@ def smiles_2_fingerprint_ECFP4(smiles):
     smiles: str, SMILES string. 
 
   Returns:
-    fp: rdkit.DataStructs.cDataStructs.UIntSparseIntVect
+    fp: rdkit.DataStructs.cDataStructs.ULongSparseIntVect (UIntSparseIntVect on older RDKit)
 
   """
-  molecule = smiles_to_rdkit_mol(smiles)
-  fp = AllChem.GetMorganFingerprint(molecule, 2)
-  return fp 
+  return _fresh_fingerprint('ECFP4', smiles)
 
 
 def smiles_2_fingerprint_FCFP4(smiles):
@@ -86,12 +256,10 @@ def smiles_2_fingerprint_FCFP4(smiles):
     smiles: str, SMILES string. 
 
   Returns:
-    fp: rdkit.DataStructs.cDataStructs.UIntSparseIntVect
+    fp: rdkit.DataStructs.cDataStructs.ULongSparseIntVect (UIntSparseIntVect on older RDKit)
 
   """
-  molecule = smiles_to_rdkit_mol(smiles)
-  fp = AllChem.GetMorganFingerprint(molecule, 2, useFeatures=True)
-  return fp 
+  return _fresh_fingerprint('FCFP4', smiles)
 
 
 def smiles_2_fingerprint_AP(smiles):
@@ -104,9 +272,7 @@ def smiles_2_fingerprint_AP(smiles):
     fp: rdkit.DataStructs.cDataStructs.IntSparseIntVect
 
   """
-  molecule = smiles_to_rdkit_mol(smiles)
-  fp = AllChem.GetAtomPairFingerprint(molecule, maxLength=10)
-  return fp 
+  return _fresh_fingerprint('AP', smiles)
 
 def smiles_2_fingerprint_ECFP6(smiles):
   """Convert smiles into ECFP6 Fingerprint. 
@@ -115,12 +281,41 @@ def smiles_2_fingerprint_ECFP6(smiles):
     smiles: str, SMILES string. 
 
   Returns:
-    fp: rdkit.DataStructs.cDataStructs.UIntSparseIntVect
+    fp: rdkit.DataStructs.cDataStructs.ULongSparseIntVect (UIntSparseIntVect on older RDKit)
 
   """  
-  molecule = smiles_to_rdkit_mol(smiles)
-  fp = AllChem.GetMorganFingerprint(molecule, 3)
-  return fp 
+  return _fresh_fingerprint('ECFP6', smiles)
+
+@lru_cache(maxsize=ORACLE_CACHE_SIZE)
+def _cached_logp(smiles):
+  return Descriptors.MolLogP(_cached_mol(smiles))
+
+@lru_cache(maxsize=ORACLE_CACHE_SIZE)
+def _cached_tpsa(smiles):
+  return Descriptors.TPSA(_cached_mol(smiles))
+
+def _logp_of(smiles, molecule):
+  """MolLogP of a molecule, memoized on the SMILES string so MPOs sharing a molecule compute it once. 
+  """
+  if isinstance(smiles, str):
+    return _cached_logp(smiles)
+  return Descriptors.MolLogP(molecule)
+
+def _tpsa_of(smiles, molecule):
+  """TPSA of a molecule, memoized on the SMILES string so MPOs sharing a molecule compute it once. 
+  """
+  if isinstance(smiles, str):
+    return _cached_tpsa(smiles)
+  return Descriptors.TPSA(molecule)
+
+def clear_oracle_caches():
+  """Drop the memoized molecules, fingerprints and descriptors, e.g., to bound memory in long runs. 
+  """
+  _cached_mol.cache_clear()
+  _cached_fingerprint.cache_clear()
+  _cached_logp.cache_clear()
+  _cached_tpsa.cache_clear()
+  _cached_phco_fingerprint.cache_clear()
 
 fp2fpfunc = {'ECFP4': smiles_2_fingerprint_ECFP4, 
              'FCFP4': smiles_2_fingerprint_FCFP4, 
@@ -146,6 +341,18 @@ class ScoreModifier:
             float or np.array (depending on the type of x) after application of the distance function.
         """
 
+    def batch(self, x):
+        """
+        Apply the modifier on an array of values in a single vectorized call.
+
+        Args:
+            x: sequence or np.array of floats
+
+        Returns:
+            np.array of modified values
+        """
+        return self(np.asarray(x, dtype=float))
+
 
 class ChainedModifier(ScoreModifier):
     """
@@ -191,7 +398,10 @@ class SquaredModifier(ScoreModifier):
         self.coefficient = coefficient
 
     def __call__(self, x):
-        return 1.0 - self.coefficient * np.square(self.target_value - x)
+        d = self.target_value - x
+        if isinstance(x, (int, float)):
+            return 1.0 - self.coefficient * d * d
+        return 1.0 - self.coefficient * np.square(d)
 
 
 class AbsoluteScoreModifier(ScoreModifier):
@@ -204,6 +414,8 @@ class AbsoluteScoreModifier(ScoreModifier):
         self.target_value = target_value
 
     def __call__(self, x):
+        if isinstance(x, (int, float)):
+            return 1. - abs(self.target_value - x)
         return 1. - np.abs(self.target_value - x)
 
 
@@ -215,9 +427,13 @@ class GaussianModifier(ScoreModifier):
     def __init__(self, mu: float, sigma: float) -> None:
         self.mu = mu
         self.sigma = sigma
+        self._inv_sigma2_half = 0.5 / (sigma * sigma)
 
     def __call__(self, x):
-        return np.exp(-0.5 * np.power((x - self.mu) / self.sigma, 2.))
+        d = x - self.mu
+        if isinstance(x, (int, float)):
+            return math.exp(-d * d * self._inv_sigma2_half)
+        return np.exp(-self._inv_sigma2_half * np.square(d))
 
 
 class MinMaxGaussianModifier(ScoreModifier):
@@ -234,7 +450,9 @@ class MinMaxGaussianModifier(ScoreModifier):
         self._full_gaussian = GaussianModifier(mu=mu, sigma=sigma)
 
     def __call__(self, x):
-        if self.minimize:
+        if isinstance(x, (int, float)):
+            mod_x = max(x, self.mu) if self.minimize else min(x, self.mu)
+        elif self.minimize:
             mod_x = np.maximum(x, self.mu)
         else:
             mod_x = np.minimum(x, self.mu)
@@ -274,6 +492,8 @@ class ClippedScoreModifier(ScoreModifier):
 
     def __call__(self, x):
         y = self.slope * x + self.intercept
+        if isinstance(x, (int, float)):
+            return min(max(y, self.low_score), self.high_score)
         return np.clip(y, self.low_score, self.high_score)
 
 
@@ -304,9 +524,16 @@ class SmoothClippedScoreModifier(ScoreModifier):
         self.k = 4.0 / (upper_x - lower_x)
         self.middle_x = (upper_x + lower_x) / 2
         self.L = high_score - low_score
+        self._k_middle_x = self.k * self.middle_x
 
     def __call__(self, x):
-        return self.low_score + self.L / (1 + np.exp(-self.k * (x - self.middle_x)))
+        if isinstance(x, (int, float)):
+            try:
+                return self.low_score + self.L / (1 + math.exp(self._k_middle_x - self.k * x))
+            except OverflowError:
+                # np.exp overflows to inf here, which pins the score to low_score
+                return self.low_score
+        return self.low_score + self.L / (1 + np.exp(self._k_middle_x - self.k * x))
 
 
 class ThresholdedLinearModifier(ScoreModifier):
@@ -318,6 +545,8 @@ class ThresholdedLinearModifier(ScoreModifier):
         self.threshold = threshold
 
     def __call__(self, x):
+        if isinstance(x, (int, float)):
+            return min(x, self.threshold) / self.threshold
         return np.minimum(x, self.threshold) / self.threshold
 
 # check the license for the code from readFragmentScores to CalculateScore here: https://github.com/EricTing/SAscore/blob/89d7689a85efed3cc918fb8ba6fe5cedf60b4a5a/src/sascorer.py#L134
@@ -336,11 +565,7 @@ def readFragmentScores(name='fpscores'):
       import sys
       sys.exit("TDC is hosted in Harvard Dataverse and it is currently under maintenance, please check back in a few hours or checkout https://dataverse.harvard.edu/.")
 
-    outDict = {}
-    for i in _fscores:
-        for j in range(1,len(i)):
-            outDict[i[j]] = float(i[0])
-    _fscores = outDict
+    _fscores = {bitId: float(i[0]) for i in _fscores for bitId in i[1:]}
 
 def numBridgeheadsAndSpiro(mol,ri=None):
   nSpiro = rdMolDescriptors.CalcNumSpiroAtoms(mol)
@@ -353,17 +578,15 @@ def calculateScore(m):
   # fragment score
   fp = rdMolDescriptors.GetMorganFingerprint(m,2)  #<- 2 is the *radius* of the circular fingerprint
   fps = fp.GetNonzeroElements()
-  score1 = 0.
-  nf = 0
-  for bitId,v in iteritems(fps):
-    nf += v
-    sfp = bitId
-    score1 += _fscores.get(sfp,-4)*v
+  fscore = _fscores.get
+  score1 = sum(fscore(bitId,-4)*v for bitId,v in fps.items())
+  nf = sum(fps.values())
   score1 /= nf
 
   # features score
   nAtoms = m.GetNumAtoms()
-  nChiralCenters = len(Chem.FindMolChiralCenters(m,includeUnassigned=True))
+  # counts assigned and unassigned stereocenters, as FindMolChiralCenters(includeUnassigned=True)
+  nChiralCenters = rdMolDescriptors.CalcNumAtomStereoCenters(m)
   ri = m.GetRingInfo()
   nBridgeheads,nSpiro=numBridgeheadsAndSpiro(m,ri)
   nMacrocycles=0
@@ -425,6 +648,89 @@ def load_pickled_model(name: str):
     sys.exit("TDC is hosted in Harvard Dataverse and it is currently under maintenance, please check back in a few hours or checkout https://dataverse.harvard.edu/.")
   return model
 
+# pickled models shared by all oracle calls, loaded once per process
+_MODELS = {}
+_MODEL_LOCK = threading.Lock()
+
+def _get_model(name, loader):
+  """
+  Return the cached model registered under name, calling loader on first use.
+
+  Args:
+    name: key of the model in the cache.
+    loader: zero-argument callable that loads the model.
+
+  Returns:
+    The model.
+  """
+  model = _MODELS.get(name)
+  if model is None:
+    with _MODEL_LOCK:
+      model = _MODELS.get(name)
+      if model is None:
+        model = _MODELS[name] = loader()
+  return model
+
+# opt-in ONNX Runtime scoring of the sklearn classifier oracles, needs skl2onnx and onnxruntime
+USE_ONNX = False
+
+class _OnnxClassifier:
+  """predict_proba over an ONNX Runtime session converted from a sklearn classifier.
+  """
+  def __init__(self, session):
+    self.session = session
+    self.input_name = session.get_inputs()[0].name
+
+  def predict_proba(self, X):
+    return self.session.run(None, {self.input_name: np.asarray(X, dtype=np.float32)})[1]
+
+def _load_onnx_classifier(onnx_path, loader):
+  """
+  Load a classifier as an ONNX Runtime session, converting the pickled model on first use.
+
+  Args:
+    onnx_path: path of the converted model, written next to the pickle.
+    loader: zero-argument callable that loads the sklearn model.
+
+  Returns:
+    _OnnxClassifier
+  """
+  try:
+    import onnxruntime
+  except:
+    raise ImportError("Please install onnxruntime by 'pip install onnxruntime'! ")
+  if not op.exists(onnx_path):
+    try:
+      from skl2onnx import convert_sklearn
+      from skl2onnx.common.data_types import FloatTensorType
+    except:
+      raise ImportError("Please install skl2onnx by 'pip install skl2onnx'! ")
+    model = loader()
+    onx = convert_sklearn(model, initial_types=[('input', FloatTensorType([None, 2048]))], 
+                          options={id(model): {'zipmap': False}})
+    with open(onnx_path, 'wb') as f:
+      f.write(onx.SerializeToString())
+  return _OnnxClassifier(onnxruntime.InferenceSession(onnx_path))
+
+def _get_classifier(name, loader, use_onnx=None):
+  """
+  Return the cached classifier registered under name, as an ONNX Runtime session if requested.
+
+  Args:
+    name: name of the oracle model, f.i. 'drd2'.
+    loader: zero-argument callable that loads the sklearn model.
+    use_onnx: bool, defaults to USE_ONNX.
+
+  Returns:
+    An object with a sklearn-style predict_proba.
+  """
+  if use_onnx is None:
+    use_onnx = USE_ONNX
+  if use_onnx:
+    onnx_path = op.join('oracle', name + '.onnx')
+    return _get_model(name + '_onnx', partial(_load_onnx_classifier, onnx_path, loader))
+  return _get_model(name, loader)
+
 # clf_model = None
 def load_drd2_model():
     name = 'oracle/drd2.pkl'
@@ -441,28 +747,28 @@ def load_drd2_model():
 def fingerprints_from_mol(mol):
     fp = AllChem.GetMorganFingerprint(mol, 3, useCounts=True, useFeatures=True)
     size = 2048
-    nfp = np.zeros((1, size), np.int32)
-    for idx,v in fp.GetNonzeroElements().items():
-        nidx = idx%size
-        nfp[0, nidx] += int(v)
-    return nfp
+    items = fp.GetNonzeroElements()
+    idx = np.fromiter(items.keys(), dtype=np.int64, count=len(items))
+    val = np.fromiter(items.values(), dtype=np.int32, count=len(items))
+    nfp = np.zeros(size, np.int32)
+    # fold the sparse counts onto 2048 bits, np.add.at accumulates colliding indices
+    np.add.at(nfp, idx % size, val)
+    return nfp.reshape(1, size)
 
 def drd2(smile):
     """Evaluate DRD2 score of a SMILES string
 
     Args:
-      smiles: str
+      smiles: str or rdkit.Chem.rdchem.Mol
 
     Returns:
       drd_score: float 
 
     """
 
-    if 'drd2_model' not in globals().keys():
-        global drd2_model
-        drd2_model = load_drd2_model() 
+    drd2_model = _get_classifier('drd2', load_drd2_model)
 
-    mol = Chem.MolFromSmiles(smile)
+    mol = _to_mol(smile)
     if mol:
         fp = fingerprints_from_mol(mol)
         score = drd2_model.predict_proba(fp)[:, 1]
@@ -470,6 +776,23 @@ def drd2(smile):
         return drd_score
     return 0.0
 
+def drd2_batch(smiles_list):
+    """Evaluate DRD2 scores of a list of SMILES strings with a single predict_proba call
+
+    Args:
+      smiles_list: list of str or rdkit.Chem.rdchem.Mol
+
+    Returns:
+      drd_scores: np.ndarray of float, 0.0 for invalid SMILES
+
+    """
+
+    drd2_model = _get_classifier('drd2', load_drd2_model)
+
+    return _predict_proba_batch(drd2_model, smiles_list, fingerprints_from_mol)
+
+drd2.batch = drd2_batch
+
 def load_cyp3a4_veith():
   oracle_file = "oracle/cyp3a4_veith.pkl"
   return load_pickled_model(oracle_file)
@@ -482,9 +805,7 @@ def cyp3a4_veith(smiles):
 
   import os 
   os.environ["CUDA_VISIBLE_DEVICES"]='-1'  
-  if 'cyp3a4_veith_model' not in globals().keys():
-    global cyp3a4_veith_model 
-    cyp3a4_veith_model = load_cyp3a4_veith()
+  cyp3a4_veith_model = _get_model('cyp3a4_veith', load_cyp3a4_veith)
 
   import warnings, os
   warnings.filterwarnings("ignore")
@@ -525,7 +846,7 @@ def qed(smiles):
   """Evaluate QED score of a SMILES string
 
     Args:
-      smiles: str
+      smiles: str or rdkit.Chem.rdchem.Mol
 
     Returns:
       qed_score: float, between 0 and 1.  
@@ -533,7 +854,7 @@ def qed(smiles):
   """  
   if smiles is None: 
     return 0.0  
-  mol = Chem.MolFromSmiles(smiles)
+  mol = _to_mol(smiles)
   if mol is None: 
     return 0.0
   return QED.qed(mol)
@@ -542,7 +863,7 @@ def penalized_logp(s):
   """Evaluate LogP score of a SMILES string
 
     Args:
-      smiles: str
+      smiles: str or rdkit.Chem.rdchem.Mol
 
     Returns:
       logp_score: float, between - infinity and + infinity 
@@ -550,7 +871,7 @@ def penalized_logp(s):
   """  
   if s is None: 
     return -100.0
-  mol = Chem.MolFromSmiles(s)
+  mol = _to_mol(s)
   if mol is None: 
     return -100.0
 
@@ -565,6 +886,7 @@ def penalized_logp(s):
   SA = -calculateScore(mol)
 
   # cycle score
+  # the benchmark is defined on networkx's cycle basis, which differs from RDKit's SSSR on bridged ring systems
   cycle_list = nx.cycle_basis(nx.Graph(Chem.rdmolops.GetAdjacencyMatrix(mol)))
   if len(cycle_list) == 0:
     cycle_length = 0
@@ -586,7 +908,7 @@ def SA(s):
   """Evaluate SA score of a SMILES string
 
     Args:
-      smiles: str
+      smiles: str or rdkit.Chem.rdchem.Mol
 
     Returns:
       SAscore: float 
@@ -594,12 +916,28 @@ def SA(s):
   """  
   if s is None:
     return 100 
-  mol = Chem.MolFromSmiles(s)
+  mol = _to_mol(s)
   if mol is None:
     return 100 
   SAscore = calculateScore(mol)
   return SAscore 	
 
+def _morgan_bitvect_features(molecule):
+  fp = AllChem.GetMorganFingerprintAsBitVect(molecule, 2, nBits=2048)
+  # allocate the full width up front, a (1,) array makes ConvertToNumpyArray resize it
+  features = np.zeros(2048, dtype=np.uint8)
+  DataStructs.ConvertToNumpyArray(fp, features)
+  return features.reshape(1, 2048)
+
+def _predict_proba_batch(model, smiles_list, featurize=_morgan_bitvect_features):
+  mols = [_to_mol(smiles) for smiles in smiles_list]
+  valid = [i for i, mol in enumerate(mols) if mol]
+  scores = np.zeros(len(mols))
+  if valid:
+    fps = np.vstack([featurize(mols[i]) for i in valid])
+    scores[valid] = model.predict_proba(fps)[:, 1]
+  return scores
+
 def load_gsk3b_model():
     gsk3_model_path = 'oracle/gsk3b.pkl'
     if SKLEARN_VERSION >= version.parse("0.24.0"):
@@ -610,50 +948,70 @@ def gsk3b(smiles):
     """Evaluate GSK3B score of a SMILES string
 
     Args:
-      smiles: str
+      smiles: str or rdkit.Chem.rdchem.Mol
 
     Returns:
       gsk3_score: float, between 0 and 1.   
 
     """  
-    if 'gsk3_model' not in globals().keys():
-        global gsk3_model 
-        gsk3_model = load_gsk3b_model()
-
-    molecule = smiles_to_rdkit_mol(smiles)
-    fp = AllChem.GetMorganFingerprintAsBitVect(molecule, 2, nBits=2048)
-    features = np.zeros((1,))
-    DataStructs.ConvertToNumpyArray(fp, features)
-    fp = features.reshape(1, -1) 
+    gsk3_model = _get_classifier('gsk3b', load_gsk3b_model)
+
+    molecule = _to_mol(smiles)
+    fp = _morgan_bitvect_features(molecule)
     gsk3_score = gsk3_model.predict_proba(fp)[0,1]
     return gsk3_score 
 
+def gsk3b_batch(smiles_list):
+    """Evaluate GSK3B scores of a list of SMILES strings with a single predict_proba call
+
+    Args:
+      smiles_list: list of str or rdkit.Chem.rdchem.Mol
+
+    Returns:
+      gsk3_scores: np.ndarray of float, between 0 and 1, 0.0 for invalid SMILES
+
+    """
+    gsk3_model = _get_classifier('gsk3b', load_gsk3b_model)
+
+    return _predict_proba_batch(gsk3_model, smiles_list)
+
+gsk3b.batch = gsk3b_batch
+
+def load_jnk3_model():
+    jnk3_model_path = 'oracle/jnk3.pkl'
+    if SKLEARN_VERSION >= version.parse("0.24.0"):
+      jnk3_model_path = 'oracle/jnk3_current.pkl'
+    return load_pickled_model(jnk3_model_path)
+
 class jnk3:
   """Evaluate JSK3 score of a SMILES string
 
     Args:
-      smiles: str
+      smiles: str or rdkit.Chem.rdchem.Mol
 
     Returns:
       jnk3_score: float , between 0 and 1.  
 
   """  
-  def __init__(self):
-    
-    jnk3_model_path = 'oracle/jnk3.pkl'
-    if SKLEARN_VERSION >= version.parse("0.24.0"):
-      jnk3_model_path = 'oracle/jnk3_current.pkl'
-    self.jnk3_model = load_pickled_model(jnk3_model_path)
+  def __init__(self, use_onnx=None):
+    """
+    Args:
+      use_onnx: bool, score with ONNX Runtime instead of sklearn, defaults to USE_ONNX.
+    """
+    self.jnk3_model = _get_classifier('jnk3', load_jnk3_model, use_onnx)
 
   def __call__(self, smiles):
-    molecule = smiles_to_rdkit_mol(smiles)
-    fp = AllChem.GetMorganFingerprintAsBitVect(molecule, 2, nBits=2048)
-    features = np.zeros((1,))
-    DataStructs.ConvertToNumpyArray(fp, features)
-    fp = features.reshape(1, -1) 
+    molecule = _to_mol(smiles)
+    fp = _morgan_bitvect_features(molecule)
     jnk3_score = self.jnk3_model.predict_proba(fp)[0,1]
     return jnk3_score
 
+  def batch(self, smiles_list):
+    """Evaluate JNK3 scores of a list of SMILES strings with a single predict_proba call"""
+    return _predict_proba_batch(self.jnk3_model, smiles_list)
+
+_FORMULA_RE = re.compile(r'([A-Z][a-z]*)(\d*)')
+
 class AtomCounter:
 
     def __init__(self, element):
@@ -662,6 +1020,7 @@ class AtomCounter:
             element: element to count within a molecule
         """
         self.element = element
+        self._atomic_num = Chem.GetPeriodicTable().GetAtomicNumber(element)
 
     def __call__(self, mol):
         """
@@ -673,11 +1032,29 @@ class AtomCounter:
         Returns:
             The number of atoms of the given type.
         """
-        # if the molecule contains H atoms, they may be implicit, so add them
-        if self.element == 'H':
-            mol = Chem.AddHs(mol)
+        # if the molecule contains H atoms, they may be implicit, so count the Hs carried by each atom
+        if self._atomic_num == 1:
+            return sum(a.GetTotalNumHs() + (a.GetAtomicNum() == 1) for a in mol.GetAtoms())
+
+        atomic_num = self._atomic_num
+        return sum(1 for a in mol.GetAtoms() if a.GetAtomicNum() == atomic_num)
 
-        return sum(1 for a in mol.GetAtoms() if a.GetSymbol() == self.element)
+def _count_atoms(mol):
+    """
+    Count the atoms of every element in one pass, including implicit hydrogens.
+
+    Args:
+        mol: molecule
+
+    Returns:
+        A dict mapping atomic numbers to the number of atoms.
+    """
+    counts = {1: 0}
+    for a in mol.GetAtoms():
+        atomic_num = a.GetAtomicNum()
+        counts[atomic_num] = counts.get(atomic_num, 0) + 1
+        counts[1] += a.GetTotalNumHs()
+    return counts
 
 def parse_molecular_formula(formula):
     """
@@ -689,17 +1066,10 @@ def parse_molecular_formula(formula):
     Returns:
         A list of tuples containing element types and number of occurrences.
     """
-    import re 
-    matches = re.findall(r'([A-Z][a-z]*)(\d*)', formula)
+    matches = _FORMULA_RE.findall(formula)
 
-    # Convert matches to the required format
-    results = []
-    for match in matches:
-        # convert count to an integer, and set it to 1 if the count is not visible in the molecular formula
-        count = 1 if not match[1] else int(match[1])
-        results.append((match[0], count))
-
-    return results
+    # convert count to an integer, and set it to 1 if the count is not visible in the molecular formula
+    return [(element, int(count) if count else 1) for element, count in matches]
 
 
 def smiles2formula(smiles):
@@ -736,19 +1106,21 @@ class Isomer_scoring_prev:
   def __init__(self, target_smiles, means = 'geometric'):
     assert means in ['geometric', 'arithmetic']
     if means == 'geometric':
-      self.mean_func = gmean 
+      self.mean_func = _gmean_small 
     else: 
       self.mean_func = np.mean 
     atom2cnt_lst = parse_molecular_formula(target_smiles)
     total_atom_num = sum([cnt for atom,cnt in atom2cnt_lst]) 
     self.total_atom_modifier = GaussianModifier(mu=total_atom_num, sigma=2.0)
     self.AtomCounter_Modifier_lst = [((AtomCounter(atom)), GaussianModifier(mu=cnt,sigma=1.0)) for atom,cnt in atom2cnt_lst]
+    self._atomic_num_modifiers = [(atom_counter._atomic_num, modifier_func) for atom_counter, modifier_func in self.AtomCounter_Modifier_lst]
 
   def __call__(self, test_smiles):
-    molecule = smiles_to_rdkit_mol(test_smiles)
-    all_scores = []
-    for atom_counter, modifier_func in self.AtomCounter_Modifier_lst:
-      all_scores.append(modifier_func(atom_counter(molecule)))
+    molecule = _to_mol(test_smiles)
+    if not isinstance(test_smiles, str):
+      test_smiles = Chem.MolToSmiles(test_smiles)
+    atom_counts = _count_atoms(molecule)
+    all_scores = [modifier_func(atom_counts.get(atomic_num, 0)) for atomic_num, modifier_func in self._atomic_num_modifiers]
 
     ### total atom number 
     atom2cnt_lst = parse_molecular_formula(test_smiles)
@@ -762,35 +1134,27 @@ class Isomer_scoring:
   def __init__(self, target_smiles, means = 'geometric'):
     assert means in ['geometric', 'arithmetic']
     if means == 'geometric':
-      self.mean_func = gmean 
+      self.mean_func = _gmean_small 
     else: 
       self.mean_func = np.mean 
     atom2cnt_lst = parse_molecular_formula(target_smiles)
     total_atom_num = sum([cnt for atom,cnt in atom2cnt_lst]) 
     self.total_atom_modifier = GaussianModifier(mu=total_atom_num, sigma=2.0)
     self.AtomCounter_Modifier_lst = [((AtomCounter(atom)), GaussianModifier(mu=cnt,sigma=1.0)) for atom,cnt in atom2cnt_lst]
+    self._atomic_num_modifiers = [(atom_counter._atomic_num, modifier_func) for atom_counter, modifier_func in self.AtomCounter_Modifier_lst]
 
   def __call__(self, test_smiles):
     #### difference 1
-    #### add hydrogen atoms 
-    test_smiles = canonicalize(test_smiles)
-    test_mol = Chem.MolFromSmiles(test_smiles)
-    test_mol2 = Chem.AddHs(test_mol) 
-    test_smiles = Chem.MolToSmiles(test_mol2)
-
-
-    molecule = smiles_to_rdkit_mol(test_smiles)
-    all_scores = []
-    for atom_counter, modifier_func in self.AtomCounter_Modifier_lst:
-      all_scores.append(modifier_func(atom_counter(molecule)))
+    #### hydrogen atoms are counted from the parsed molecule, 
+    #### round-tripping through an explicit-H SMILES string gives the same molecule
+    molecule = _to_mol(test_smiles)
+    atom_counts = _count_atoms(molecule)
+    all_scores = [modifier_func(atom_counts.get(atomic_num, 0)) for atomic_num, modifier_func in self._atomic_num_modifiers]
 
     #### difference 2 
-    ### total atom number
-    test_formula = smiles2formula(test_smiles)
-    atom2cnt_lst = parse_molecular_formula(test_formula)
+    ### total atom number, as in the molecular formula (dummy atoms have no element)
     # atom2cnt_lst = parse_molecular_formula(test_smiles)
-    # ## todo add Hs 
-    total_atom_num = sum([cnt for atom,cnt in atom2cnt_lst])
+    total_atom_num = sum(cnt for atomic_num, cnt in atom_counts.items() if atomic_num)
     all_scores.append(self.total_atom_modifier(total_atom_num))
     return self.mean_func(all_scores)
 
@@ -809,9 +1173,33 @@ isomers_c9h10n2o2pf2cl = isomer_meta(target_smiles = 'C9H10N2O2PF2Cl', means = '
 isomers_c11h24 = isomer_meta(target_smiles = 'C11H24', means = 'geometric')
 
 
+def _similarity_func(fp, use_counts):
+  if use_counts:
+    return partial(_fingerprint, fp)
+  return partial(_fingerprint, fp + '_bits')
+
+def _bulk_tanimoto(target_fp, similarity_func, smiles_list):
+  """Tanimoto similarities of a list of SMILES strings to one target fingerprint, 0.0 for invalid SMILES. 
+  """
+  mols = [_to_mol(smiles) for smiles in smiles_list]
+  valid = [i for i, mol in enumerate(mols) if mol is not None]
+  similarity_values = np.zeros(len(mols))
+  if valid:
+    # strings keep the fingerprint memoized, parsed mols are fingerprinted directly
+    test_fps = [similarity_func(smiles_list[i] if isinstance(smiles_list[i], str) else mols[i]) for i in valid]
+    similarity_values[valid] = DataStructs.BulkTanimotoSimilarity(target_fp, test_fps)
+  return similarity_values
+
 class rediscovery_meta:
-  def __init__(self, target_smiles, fp = 'ECFP4'):
-    self.similarity_func = fp2fpfunc[fp]
+  def __init__(self, target_smiles, fp = 'ECFP4', use_counts = True):
+    """
+    Args:
+      target_smiles: str, SMILES string of the molecule to rediscover.
+      fp: str, one of 'ECFP4', 'FCFP4', 'AP', 'ECFP6'.
+      use_counts: bool, False folds the fingerprints into 2048-bit vectors, 
+        faster but not score-compatible with the count-based default.
+    """
+    self.similarity_func = _similarity_func(fp, use_counts)
     self.target_fp = self.similarity_func(target_smiles)
 
   def __call__(self, test_smiles):
@@ -819,9 +1207,21 @@ class rediscovery_meta:
     similarity_value = DataStructs.TanimotoSimilarity(self.target_fp, test_fp)
     return similarity_value 
 
+  def batch(self, smiles_list):
+    """Score a list of SMILES strings with one BulkTanimotoSimilarity call, 0.0 for invalid SMILES."""
+    return _bulk_tanimoto(self.target_fp, self.similarity_func, smiles_list)
+
 class similarity_meta:
-  def __init__(self, target_smiles, fp = 'FCFP4', modifier_func = None):
-    self.similarity_func = fp2fpfunc[fp]
+  def __init__(self, target_smiles, fp = 'FCFP4', modifier_func = None, use_counts = True):
+    """
+    Args:
+      target_smiles: str, SMILES string of the reference molecule.
+      fp: str, one of 'ECFP4', 'FCFP4', 'AP', 'ECFP6'.
+      modifier_func: ScoreModifier applied to the similarity, None to return it as is.
+      use_counts: bool, False folds the fingerprints into 2048-bit vectors, 
+        faster but not score-compatible with the count-based default.
+    """
+    self.similarity_func = _similarity_func(fp, use_counts)
     self.target_fp = self.similarity_func(target_smiles)
     self.modifier_func = modifier_func 
 
@@ -834,6 +1234,13 @@ class similarity_meta:
       modifier_score = self.modifier_func(similarity_value)
     return modifier_score 
 
+  def batch(self, smiles_list):
+    """Score a list of SMILES strings with one BulkTanimotoSimilarity call, 0.0 similarity for invalid SMILES."""
+    similarity_values = _bulk_tanimoto(self.target_fp, self.similarity_func, smiles_list)
+    if self.modifier_func is None:
+      return similarity_values
+    return self.modifier_func(similarity_values)
+
 celecoxib_rediscovery = rediscovery_meta(target_smiles = 'CC1=CC=C(C=C1)C1=CC(=NN1C1=CC=C(C=C1)S(N)(=O)=O)C(F)(F)F', fp = 'ECFP4')
 troglitazone_rediscovery = rediscovery_meta(target_smiles = 'Cc1c(C)c2OC(C)(COc3ccc(CC4SC(=O)NC4=O)cc3)CCc2c(C)c1O', fp = 'ECFP4')
 thiothixene_rediscovery = rediscovery_meta(target_smiles = 'CN(C)S(=O)(=O)c1ccc2Sc3ccccc3C(=CCCN4CCN(C)CC4)c2c1', fp = 'ECFP4')
@@ -853,8 +1260,8 @@ mestranol_similarity = similarity_meta(target_smiles = 'COc1ccc2[C@H]3CC[C@@]4(C
 
 class median_meta:
   def __init__(self, target_smiles_1, target_smiles_2, fp1 = 'ECFP6', fp2 = 'ECFP6', modifier_func1 = None, modifier_func2 = None, means = 'geometric'):
-    self.similarity_func1 = fp2fpfunc[fp1]
-    self.similarity_func2 = fp2fpfunc[fp2]
+    self.similarity_func1 = partial(_fingerprint, fp1)
+    self.similarity_func2 = self.similarity_func1 if fp2 == fp1 else partial(_fingerprint, fp2)
     self.target_fp1 = self.similarity_func1(target_smiles_1)
     self.target_fp2 = self.similarity_func2(target_smiles_2)
     self.modifier_func1 = modifier_func1 
@@ -913,7 +1320,7 @@ class MPO_meta:
 
 
   def __call__(self, test_smiles):
-    molecule = smiles_to_rdkit_mol(test_smiles)
+    molecule = _to_mol(test_smiles)
 
     score_lst = []
     return self.mean_func(score_lst)
@@ -923,8 +1330,8 @@ def osimertinib_mpo(test_smiles):
   if 'osimertinib_fp_fcfc4' not in globals().keys():
     global osimertinib_fp_fcfc4, osimertinib_fp_ecfc6
     osimertinib_smiles = 'COc1cc(N(C)CCN(C)C)c(NC(=O)C=C)cc1Nc2nccc(n2)c3cn(C)c4ccccc34'
-    osimertinib_fp_fcfc4 = smiles_2_fingerprint_FCFP4(osimertinib_smiles)
-    osimertinib_fp_ecfc6 = smiles_2_fingerprint_ECFP6(osimertinib_smiles)
+    osimertinib_fp_fcfc4 = _fingerprint('FCFP4', osimertinib_smiles)
+    osimertinib_fp_ecfc6 = _fingerprint('ECFP6', osimertinib_smiles)
 
 
   sim_v1_modifier = ClippedScoreModifier(upper_x=0.8)
@@ -932,40 +1339,46 @@ def osimertinib_mpo(test_smiles):
   tpsa_modifier = MaxGaussianModifier(mu=100, sigma=10) 
   logp_modifier = MinGaussianModifier(mu=1, sigma=1) 
 
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  fp_fcfc4 = smiles_2_fingerprint_FCFP4(test_smiles)
-  fp_ecfc6 = smiles_2_fingerprint_ECFP6(test_smiles)
-  tpsa_score = tpsa_modifier(Descriptors.TPSA(molecule))
-  logp_score = logp_modifier(Descriptors.MolLogP(molecule))
+  molecule = _to_mol(test_smiles)
+  # the geometric mean is 0 as soon as one component is, so the clipped similarity goes first
+  fp_fcfc4 = _fingerprint('FCFP4', test_smiles)
   similarity_v1 = sim_v1_modifier(DataStructs.TanimotoSimilarity(osimertinib_fp_fcfc4, fp_fcfc4))
+  if similarity_v1 == 0.0:
+    return 0.0
+  fp_ecfc6 = _fingerprint('ECFP6', test_smiles)
+  tpsa_score = tpsa_modifier(_tpsa_of(test_smiles, molecule))
+  logp_score = logp_modifier(_logp_of(test_smiles, molecule))
   similarity_v2 = sim_v2_modifier(DataStructs.TanimotoSimilarity(osimertinib_fp_ecfc6, fp_ecfc6))
 
-  osimertinib_gmean = gmean([tpsa_score, logp_score, similarity_v1, similarity_v2])
+  osimertinib_gmean = _gmean_small([tpsa_score, logp_score, similarity_v1, similarity_v2])
   return osimertinib_gmean 
 
 def fexofenadine_mpo(test_smiles):
   if 'fexofenadine_fp' not in globals().keys():
     global fexofenadine_fp
     fexofenadine_smiles = 'CC(C)(C(=O)O)c1ccc(cc1)C(O)CCCN2CCC(CC2)C(O)(c3ccccc3)c4ccccc4'
-    fexofenadine_fp = smiles_2_fingerprint_AP(fexofenadine_smiles)
+    fexofenadine_fp = _fingerprint('AP', fexofenadine_smiles)
 
   similar_modifier = ClippedScoreModifier(upper_x=0.8)
   tpsa_modifier=MaxGaussianModifier(mu=90, sigma=10)
   logp_modifier=MinGaussianModifier(mu=4, sigma=1)
 
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  fp_ap = smiles_2_fingerprint_AP(test_smiles)
-  tpsa_score = tpsa_modifier(Descriptors.TPSA(molecule))
-  logp_score = logp_modifier(Descriptors.MolLogP(molecule))
+  molecule = _to_mol(test_smiles)
+  # the geometric mean is 0 as soon as one component is, so the clipped similarity goes first
+  fp_ap = _fingerprint('AP', test_smiles)
   similarity_value = similar_modifier(DataStructs.TanimotoSimilarity(fp_ap, fexofenadine_fp))
-  fexofenadine_gmean = gmean([tpsa_score, logp_score, similarity_value])
+  if similarity_value == 0.0:
+    return 0.0
+  tpsa_score = tpsa_modifier(_tpsa_of(test_smiles, molecule))
+  logp_score = logp_modifier(_logp_of(test_smiles, molecule))
+  fexofenadine_gmean = _gmean_small([tpsa_score, logp_score, similarity_value])
   return fexofenadine_gmean 
 
 def ranolazine_mpo(test_smiles):
   if 'ranolazine_fp' not in globals().keys():
     global ranolazine_fp, fluorine_counter  
     ranolazine_smiles = 'COc1ccccc1OCC(O)CN2CCN(CC(=O)Nc3c(C)cccc3C)CC2'
-    ranolazine_fp = smiles_2_fingerprint_AP(ranolazine_smiles)
+    ranolazine_fp = _fingerprint('AP', ranolazine_smiles)
     fluorine_counter = AtomCounter('F')
 
   similar_modifier = ClippedScoreModifier(upper_x=0.7)
@@ -973,14 +1386,17 @@ def ranolazine_mpo(test_smiles):
   logp_modifier = MaxGaussianModifier(mu=7, sigma=1)
   fluorine_modifier = GaussianModifier(mu=1, sigma=1.0)
 
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  fp_ap = smiles_2_fingerprint_AP(test_smiles)
-  tpsa_score = tpsa_modifier(Descriptors.TPSA(molecule))
-  logp_score = logp_modifier(Descriptors.MolLogP(molecule))
+  molecule = _to_mol(test_smiles)
+  # the geometric mean is 0 as soon as one component is, so the clipped similarity goes first
+  fp_ap = _fingerprint('AP', test_smiles)
   similarity_value = similar_modifier(DataStructs.TanimotoSimilarity(fp_ap, ranolazine_fp))
+  if similarity_value == 0.0:
+    return 0.0
+  tpsa_score = tpsa_modifier(_tpsa_of(test_smiles, molecule))
+  logp_score = logp_modifier(_logp_of(test_smiles, molecule))
   fluorine_value = fluorine_modifier(fluorine_counter(molecule))
 
-  ranolazine_gmean = gmean([tpsa_score, logp_score, similarity_value, fluorine_value])
+  ranolazine_gmean = _gmean_small([tpsa_score, logp_score, similarity_value, fluorine_value])
   return ranolazine_gmean
 
 def perindopril_mpo(test_smiles):
@@ -989,19 +1405,21 @@ def perindopril_mpo(test_smiles):
   if 'perindopril_fp' not in globals().keys():
     global perindopril_fp, num_aromatic_rings
     perindopril_smiles = 'O=C(OCC)C(NC(C(=O)N1C(C(=O)O)CC2CCCCC12)C)CCC'
-    perindopril_fp = smiles_2_fingerprint_ECFP4(perindopril_smiles)
+    perindopril_fp = _fingerprint('ECFP4', perindopril_smiles)
     def num_aromatic_rings(mol):
       return rdMolDescriptors.CalcNumAromaticRings(mol)
 
   arom_rings_modifier = GaussianModifier(mu = 2, sigma = 0.5)
 
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  fp_ecfp4 = smiles_2_fingerprint_ECFP4(test_smiles)
+  molecule = _to_mol(test_smiles)
+  fp_ecfp4 = _fingerprint('ECFP4', test_smiles)
 
   similarity_value = DataStructs.TanimotoSimilarity(fp_ecfp4, perindopril_fp)
+  if similarity_value == 0.0:
+    return 0.0
   num_aromatic_rings_value = arom_rings_modifier(num_aromatic_rings(molecule))
 
-  perindopril_gmean = gmean([similarity_value, num_aromatic_rings_value])
+  perindopril_gmean = _gmean_small([similarity_value, num_aromatic_rings_value])
   return perindopril_gmean
 
 def amlodipine_mpo(test_smiles):
@@ -1009,45 +1427,50 @@ def amlodipine_mpo(test_smiles):
   if 'amlodipine_fp' not in globals().keys():
     global amlodipine_fp, num_rings
     amlodipine_smiles = 'Clc1ccccc1C2C(=C(/N/C(=C2/C(=O)OCC)COCCN)C)\C(=O)OC'
-    amlodipine_fp = smiles_2_fingerprint_ECFP4(amlodipine_smiles)
+    amlodipine_fp = _fingerprint('ECFP4', amlodipine_smiles)
   
     def num_rings(mol):
       return rdMolDescriptors.CalcNumRings(mol)  
   num_rings_modifier = GaussianModifier(mu=3, sigma=0.5)
 
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  fp_ecfp4 = smiles_2_fingerprint_ECFP4(test_smiles)
+  molecule = _to_mol(test_smiles)
+  fp_ecfp4 = _fingerprint('ECFP4', test_smiles)
 
   similarity_value = DataStructs.TanimotoSimilarity(fp_ecfp4, amlodipine_fp)
+  if similarity_value == 0.0:
+    return 0.0
   num_rings_value = num_rings_modifier(num_rings(molecule))
 
-  amlodipine_gmean = gmean([similarity_value, num_rings_value])
+  amlodipine_gmean = _gmean_small([similarity_value, num_rings_value])
   return amlodipine_gmean
 
 def zaleplon_mpo_prev(test_smiles):
   if 'zaleplon_fp' not in globals().keys():
     global zaleplon_fp, isomer_scoring_C19H17N3O2
     zaleplon_smiles = 'O=C(C)N(CC)C1=CC=CC(C2=CC=NC3=C(C=NN23)C#N)=C1'
-    zaleplon_fp = smiles_2_fingerprint_ECFP4(zaleplon_smiles)
+    zaleplon_fp = _fingerprint('ECFP4', zaleplon_smiles)
     isomer_scoring_C19H17N3O2 = Isomer_scoring_prev(target_smiles = 'C19H17N3O2')
 
-  fp = smiles_2_fingerprint_ECFP4(test_smiles)
+  fp = _fingerprint('ECFP4', test_smiles)
   similarity_value = DataStructs.TanimotoSimilarity(fp, zaleplon_fp)
   isomer_value = isomer_scoring_C19H17N3O2(test_smiles)
-  return gmean([similarity_value, isomer_value])
+  return _gmean_small([similarity_value, isomer_value])
 
 
 def zaleplon_mpo(test_smiles):
   if 'zaleplon_fp' not in globals().keys():
     global zaleplon_fp, isomer_scoring_C19H17N3O2
     zaleplon_smiles = 'O=C(C)N(CC)C1=CC=CC(C2=CC=NC3=C(C=NN23)C#N)=C1'
-    zaleplon_fp = smiles_2_fingerprint_ECFP4(zaleplon_smiles)
+    zaleplon_fp = _fingerprint('ECFP4', zaleplon_smiles)
     isomer_scoring_C19H17N3O2 = Isomer_scoring(target_smiles = 'C19H17N3O2')
 
-  fp = smiles_2_fingerprint_ECFP4(test_smiles)
+  molecule = _to_mol(test_smiles)
+  fp = _fingerprint('ECFP4', test_smiles)
   similarity_value = DataStructs.TanimotoSimilarity(fp, zaleplon_fp)
-  isomer_value = isomer_scoring_C19H17N3O2(test_smiles)
-  return gmean([similarity_value, isomer_value])
+  if similarity_value == 0.0:
+    return 0.0
+  isomer_value = isomer_scoring_C19H17N3O2(molecule)
+  return _gmean_small([similarity_value, isomer_value])
 
 
 def sitagliptin_mpo_prev(test_smiles):
@@ -1055,7 +1478,7 @@ def sitagliptin_mpo_prev(test_smiles):
     global sitagliptin_fp_ecfp4, sitagliptin_logp_modifier, sitagliptin_tpsa_modifier, \
            isomers_scoring_C16H15F6N5O, sitagliptin_similar_modifier
     sitagliptin_smiles = 'Fc1cc(c(F)cc1F)CC(N)CC(=O)N3Cc2nnc(n2CC3)C(F)(F)F'
-    sitagliptin_fp_ecfp4 = smiles_2_fingerprint_ECFP4(sitagliptin_smiles)
+    sitagliptin_fp_ecfp4 = _fingerprint('ECFP4', sitagliptin_smiles)
     sitagliptin_mol = Chem.MolFromSmiles(sitagliptin_smiles)
     sitagliptin_logp = Descriptors.MolLogP(sitagliptin_mol)
     sitagliptin_tpsa = Descriptors.TPSA(sitagliptin_mol)
@@ -1064,15 +1487,15 @@ def sitagliptin_mpo_prev(test_smiles):
     isomers_scoring_C16H15F6N5O = Isomer_scoring_prev('C16H15F6N5O')
     sitagliptin_similar_modifier = GaussianModifier(mu=0, sigma=0.1)
 
-  molecule = Chem.MolFromSmiles(test_smiles)
-  fp_ecfp4 = smiles_2_fingerprint_ECFP4(test_smiles)
-  logp_score = Descriptors.MolLogP(molecule)
+  molecule = _to_mol(test_smiles)
+  fp_ecfp4 = _fingerprint('ECFP4', test_smiles)
+  logp_score = _logp_of(test_smiles, molecule)
   logp_score = sitagliptin_logp_modifier(logp_score)
-  tpsa_score = Descriptors.TPSA(molecule)
+  tpsa_score = _tpsa_of(test_smiles, molecule)
   tpsa_score = sitagliptin_tpsa_modifier(tpsa_score)
   isomer_score = isomers_scoring_C16H15F6N5O(test_smiles)
   similarity_value = sitagliptin_similar_modifier(DataStructs.TanimotoSimilarity(fp_ecfp4, sitagliptin_fp_ecfp4))
-  return gmean([similarity_value, logp_score, tpsa_score, isomer_score])
+  return _gmean_small([similarity_value, logp_score, tpsa_score, isomer_score])
 
 
 def sitagliptin_mpo(test_smiles):
@@ -1080,7 +1503,7 @@ def sitagliptin_mpo(test_smiles):
     global sitagliptin_fp_ecfp4, sitagliptin_logp_modifier, sitagliptin_tpsa_modifier, \
            isomers_scoring_C16H15F6N5O, sitagliptin_similar_modifier
     sitagliptin_smiles = 'Fc1cc(c(F)cc1F)CC(N)CC(=O)N3Cc2nnc(n2CC3)C(F)(F)F'
-    sitagliptin_fp_ecfp4 = smiles_2_fingerprint_ECFP4(sitagliptin_smiles)
+    sitagliptin_fp_ecfp4 = _fingerprint('ECFP4', sitagliptin_smiles)
     sitagliptin_mol = Chem.MolFromSmiles(sitagliptin_smiles)
     sitagliptin_logp = Descriptors.MolLogP(sitagliptin_mol)
     sitagliptin_tpsa = Descriptors.TPSA(sitagliptin_mol)
@@ -1089,119 +1512,191 @@ def sitagliptin_mpo(test_smiles):
     isomers_scoring_C16H15F6N5O = Isomer_scoring('C16H15F6N5O')
     sitagliptin_similar_modifier = GaussianModifier(mu=0, sigma=0.1)
 
-  molecule = Chem.MolFromSmiles(test_smiles)
-  fp_ecfp4 = smiles_2_fingerprint_ECFP4(test_smiles)
-  logp_score = Descriptors.MolLogP(molecule)
+  molecule = _to_mol(test_smiles)
+  fp_ecfp4 = _fingerprint('ECFP4', test_smiles)
+  logp_score = _logp_of(test_smiles, molecule)
   logp_score = sitagliptin_logp_modifier(logp_score)
-  tpsa_score = Descriptors.TPSA(molecule)
+  tpsa_score = _tpsa_of(test_smiles, molecule)
   tpsa_score = sitagliptin_tpsa_modifier(tpsa_score)
-  isomer_score = isomers_scoring_C16H15F6N5O(test_smiles)
+  isomer_score = isomers_scoring_C16H15F6N5O(molecule)
   similarity_value = sitagliptin_similar_modifier(DataStructs.TanimotoSimilarity(fp_ecfp4, sitagliptin_fp_ecfp4))
-  return gmean([similarity_value, logp_score, tpsa_score, isomer_score])
+  return _gmean_small([similarity_value, logp_score, tpsa_score, isomer_score])
+
+# Pharm2D modules, imported on the first pharmacophore fingerprint
+Generate = Gobbi_Pharm2D = None
 
 def get_PHCO_fingerprint(mol):
-  if 'Gobbi_Pharm2D' not in globals().keys():
-    global Gobbi_Pharm2D, Generate
+  global Gobbi_Pharm2D, Generate
+  if Generate is None:
     from rdkit.Chem.Pharm2D import Generate, Gobbi_Pharm2D
   return Generate.Gen2DFingerprint(mol, Gobbi_Pharm2D.factory)
 
+def _explicit_PHCO_fingerprint(mol):
+  # the dense form keeps every bit, so Tanimoto values are unchanged, 
+  # but similarity runs as word-wise popcounts instead of sparse set intersections
+  return DataStructs.ConvertToExplicit(get_PHCO_fingerprint(mol))
+
+@lru_cache(maxsize=ORACLE_CACHE_SIZE)
+def _cached_phco_fingerprint(smiles):
+  return _explicit_PHCO_fingerprint(_cached_mol(smiles))
+
+def _phco_fingerprint_of(smiles, molecule):
+  """Gobbi pharmacophore fingerprint of a molecule as an ExplicitBitVect, memoized on the SMILES string. 
+  """
+  if isinstance(smiles, str):
+    return _cached_phco_fingerprint(smiles)
+  return _explicit_PHCO_fingerprint(molecule)
+
 class SMARTS_scoring:
   def __init__(self, target_smarts, inverse):
     self.target_mol = Chem.MolFromSmarts(target_smarts)
     self.inverse = inverse
 
   def __call__(self, mol):
-    matches = mol.GetSubstructMatches(self.target_mol)
-    if len(matches) > 0:
-      if self.inverse:
-        return 0.0
-      else:
-        return 1.0
-    else:
-      if self.inverse:
-        return 1.0
-      else:
-        return 0.0
+    # presence is all that matters, HasSubstructMatch stops at the first match and skips the chirality check
+    return float(mol.HasSubstructMatch(self.target_mol, useChirality=False) ^ bool(self.inverse))
+
+# SMARTS targets of deco_hop and scaffold_hop, compiled once at import
+deco_hop_deco1_scoring = SMARTS_scoring(target_smarts = 'CS([#6])(=O)=O', inverse = True)
+deco_hop_deco2_scoring = SMARTS_scoring(target_smarts = '[#7]-c1ccc2ncsc2c1', inverse = True) 
+deco_hop_scaffold_scoring = SMARTS_scoring(target_smarts = '[#7]-c1n[c;h1]nc2[c;h1]c(-[#8])[c;h0][c;h1]c12', inverse = False) 
+deco_hop_similarity_modifier = ClippedScoreModifier(upper_x=0.85)
+
+scaffold_hop_deco_scoring = SMARTS_scoring(target_smarts = '[#6]-[#6]-[#6]-[#8]-[#6]~[#6]~[#6]~[#6]~[#6]-[#7]-c1ccc2ncsc2c1', 
+                                           inverse=False)
+scaffold_hop_scaffold_scoring = SMARTS_scoring(target_smarts = '[#7]-c1n[c;h1]nc2[c;h1]c(-[#8])[c;h0][c;h1]c12', 
+                                               inverse=True)
+scaffold_hop_similarity_modifier = ClippedScoreModifier(upper_x=0.75)
+
+@lru_cache(maxsize=None)
+def _hop_pharmacophore_fp():
+  # built on first use, Pharm2D is imported lazily
+  pharmacophor_smiles = 'CCCOc1cc2ncnc(Nc3ccc4ncsc4c3)c2cc1S(=O)(=O)C(C)(C)C'
+  pharmacophor_mol = _cached_mol(pharmacophor_smiles)
+  return _explicit_PHCO_fingerprint(pharmacophor_mol)
+
+def _bulk_phco_similarity(pharmacophor_fp, smiles_list, mols, valid):
+  fps = [_phco_fingerprint_of(smiles_list[i], mols[i]) for i in valid]
+  return np.asarray(DataStructs.BulkTanimotoSimilarity(pharmacophor_fp, fps))
 
 def deco_hop(test_smiles):
-  if 'pharmacophor_fp' not in globals().keys():
-    global pharmacophor_fp, deco1_smarts_scoring, deco2_smarts_scoring, scaffold_smarts_scoring   
-    pharmacophor_smiles = 'CCCOc1cc2ncnc(Nc3ccc4ncsc4c3)c2cc1S(=O)(=O)C(C)(C)C'
-    pharmacophor_mol = smiles_to_rdkit_mol(pharmacophor_smiles)
-    pharmacophor_fp = get_PHCO_fingerprint(pharmacophor_mol)
-
-    deco1_smarts_scoring = SMARTS_scoring(target_smarts = 'CS([#6])(=O)=O', inverse = True)
-    deco2_smarts_scoring = SMARTS_scoring(target_smarts = '[#7]-c1ccc2ncsc2c1', inverse = True) 
-    scaffold_smarts_scoring = SMARTS_scoring(target_smarts = '[#7]-c1n[c;h1]nc2[c;h1]c(-[#8])[c;h0][c;h1]c12', inverse = False) 
-
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  fp = get_PHCO_fingerprint(molecule)
-  similarity_modifier = ClippedScoreModifier(upper_x=0.85)
-
-  similarity_value = similarity_modifier(DataStructs.TanimotoSimilarity(fp, pharmacophor_fp))
-  deco1_score = deco1_smarts_scoring(molecule)
-  deco2_score = deco2_smarts_scoring(molecule)
-  scaffold_score = scaffold_smarts_scoring(molecule)
-
-  all_scores = np.mean([similarity_value, deco1_score, deco2_score, scaffold_score])
+  molecule = _to_mol(test_smiles)
+  fp = _phco_fingerprint_of(test_smiles, molecule)
+
+  similarity_value = deco_hop_similarity_modifier(DataStructs.TanimotoSimilarity(fp, _hop_pharmacophore_fp()))
+  deco1_score = deco_hop_deco1_scoring(molecule)
+  deco2_score = deco_hop_deco2_scoring(molecule)
+  scaffold_score = deco_hop_scaffold_scoring(molecule)
+
+  all_scores = 0.25 * (similarity_value + deco1_score + deco2_score + scaffold_score)
   return all_scores
 
-def scaffold_hop(test_smiles):
-  if 'pharmacophor_fp' not in globals().keys() \
-      or 'scaffold_smarts_scoring' not in globals().keys() \
-      or 'deco_smarts_scoring' not in globals().keys():
-    global pharmacophor_fp, deco_smarts_scoring, scaffold_smarts_scoring   
-    pharmacophor_smiles = 'CCCOc1cc2ncnc(Nc3ccc4ncsc4c3)c2cc1S(=O)(=O)C(C)(C)C'
-    pharmacophor_mol = smiles_to_rdkit_mol(pharmacophor_smiles)
-    pharmacophor_fp = get_PHCO_fingerprint(pharmacophor_mol)
+def deco_hop_batch(smiles_list):
+  """Evaluate deco hop scores of a list of SMILES strings with one BulkTanimotoSimilarity call
 
-    deco_smarts_scoring = SMARTS_scoring(target_smarts = '[#6]-[#6]-[#6]-[#8]-[#6]~[#6]~[#6]~[#6]~[#6]-[#7]-c1ccc2ncsc2c1', 
-                                         inverse=False)
+  Args:
+    smiles_list: list of str or rdkit.Chem.rdchem.Mol
 
-    scaffold_smarts_scoring = SMARTS_scoring(target_smarts = '[#7]-c1n[c;h1]nc2[c;h1]c(-[#8])[c;h0][c;h1]c12', 
-                                             inverse=True)
+  Returns:
+    scores: np.ndarray of float, 0.0 for invalid SMILES
 
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  fp = get_PHCO_fingerprint(molecule)
-  similarity_modifier = ClippedScoreModifier(upper_x=0.75)
+  """
+  mols = [_to_mol(smiles) for smiles in smiles_list]
+  valid = [i for i, mol in enumerate(mols) if mol is not None]
+  scores = np.zeros(len(mols))
+  if valid:
+    similarity_values = deco_hop_similarity_modifier(_bulk_phco_similarity(_hop_pharmacophore_fp(), smiles_list, mols, valid))
+    deco1_scores = np.array([deco_hop_deco1_scoring(mols[i]) for i in valid])
+    deco2_scores = np.array([deco_hop_deco2_scoring(mols[i]) for i in valid])
+    scaffold_scores = np.array([deco_hop_scaffold_scoring(mols[i]) for i in valid])
+    scores[valid] = 0.25 * (similarity_values + deco1_scores + deco2_scores + scaffold_scores)
+  return scores
+
+deco_hop.batch = deco_hop_batch
 
-  similarity_value = similarity_modifier(DataStructs.TanimotoSimilarity(fp, pharmacophor_fp))
-  deco_score = deco_smarts_scoring(molecule)
-  scaffold_score = scaffold_smarts_scoring(molecule)
+def scaffold_hop(test_smiles):
+  molecule = _to_mol(test_smiles)
+  fp = _phco_fingerprint_of(test_smiles, molecule)
 
-  all_scores = np.mean([similarity_value, deco_score, scaffold_score])
+  similarity_value = scaffold_hop_similarity_modifier(DataStructs.TanimotoSimilarity(fp, _hop_pharmacophore_fp()))
+  deco_score = scaffold_hop_deco_scoring(molecule)
+  scaffold_score = scaffold_hop_scaffold_scoring(molecule)
+
+  all_scores = (similarity_value + deco_score + scaffold_score) / 3.0
   return all_scores
 
-def valsartan_smarts(test_smiles):
-  if 'valsartan_logp_modifier' not in globals().keys():
-    global valsartan_mol, valsartan_logp_modifier, valsartan_tpsa_modifier, valsartan_bertz_modifier
-    valsartan_smarts = 'CN(C=O)Cc1ccc(c2ccccc2)cc1' ### smarts 
-    valsartan_mol = Chem.MolFromSmarts(valsartan_smarts)
+def scaffold_hop_batch(smiles_list):
+  """Evaluate scaffold hop scores of a list of SMILES strings with one BulkTanimotoSimilarity call
 
-    sitagliptin_smiles = 'NC(CC(=O)N1CCn2c(nnc2C(F)(F)F)C1)Cc1cc(F)c(F)cc1F' ### other mol
-    sitagliptin_mol = Chem.MolFromSmiles(sitagliptin_smiles)
+  Args:
+    smiles_list: list of str or rdkit.Chem.rdchem.Mol
+
+  Returns:
+    scores: np.ndarray of float, 0.0 for invalid SMILES
 
-    target_logp = Descriptors.MolLogP(sitagliptin_mol)
-    target_tpsa = Descriptors.TPSA(sitagliptin_mol)
-    target_bertz = Descriptors.BertzCT(sitagliptin_mol)
+  """
+  mols = [_to_mol(smiles) for smiles in smiles_list]
+  valid = [i for i, mol in enumerate(mols) if mol is not None]
+  scores = np.zeros(len(mols))
+  if valid:
+    similarity_values = scaffold_hop_similarity_modifier(_bulk_phco_similarity(_hop_pharmacophore_fp(), smiles_list, mols, valid))
+    deco_scores = np.array([scaffold_hop_deco_scoring(mols[i]) for i in valid])
+    scaffold_scores = np.array([scaffold_hop_scaffold_scoring(mols[i]) for i in valid])
+    scores[valid] = (similarity_values + deco_scores + scaffold_scores) / 3.0
+  return scores
+
+scaffold_hop.batch = scaffold_hop_batch
+
+valsartan_mol = Chem.MolFromSmarts('CN(C=O)Cc1ccc(c2ccccc2)cc1') ### smarts 
 
-    valsartan_logp_modifier = GaussianModifier(mu=target_logp, sigma=0.2)
-    valsartan_tpsa_modifier = GaussianModifier(mu=target_tpsa, sigma=5)
-    valsartan_bertz_modifier = GaussianModifier(mu=target_bertz, sigma=30)
+_valsartan_target_mol = Chem.MolFromSmiles('NC(CC(=O)N1CCn2c(nnc2C(F)(F)F)C1)Cc1cc(F)c(F)cc1F') ### other mol, sitagliptin
+valsartan_logp_modifier = GaussianModifier(mu=Descriptors.MolLogP(_valsartan_target_mol), sigma=0.2)
+valsartan_tpsa_modifier = GaussianModifier(mu=Descriptors.TPSA(_valsartan_target_mol), sigma=5)
+valsartan_bertz_modifier = GaussianModifier(mu=Descriptors.BertzCT(_valsartan_target_mol), sigma=30)
 
-  molecule = smiles_to_rdkit_mol(test_smiles)
-  matches = molecule.GetSubstructMatches(valsartan_mol)
-  if len(matches) > 0:
+def valsartan_smarts(test_smiles):
+  molecule = _to_mol(test_smiles)
+  if molecule.HasSubstructMatch(valsartan_mol, useChirality=False):
     smarts_score = 1.0
   else:
-    smarts_score = 0.0
+    # the geometric mean is 0 without the substructure, skip the descriptors
+    return 0.0
 
-  logp_score = valsartan_logp_modifier(Descriptors.MolLogP(molecule))
-  tpsa_score = valsartan_tpsa_modifier(Descriptors.TPSA(molecule))
+  logp_score = valsartan_logp_modifier(_logp_of(test_smiles, molecule))
+  tpsa_score = valsartan_tpsa_modifier(_tpsa_of(test_smiles, molecule))
   bertz_score = valsartan_bertz_modifier(Descriptors.BertzCT(molecule))
-  valsartan_gmean = gmean([smarts_score, tpsa_score, logp_score, bertz_score])
+  valsartan_gmean = (smarts_score * tpsa_score * logp_score * bertz_score) ** 0.25
   return valsartan_gmean
 
+def valsartan_smarts_batch(smiles_list, n_jobs=1, chunksize=64):
+  """Evaluate valsartan SMARTS scores of a list of SMILES strings, descriptors only for substructure hits
+
+  Args:
+    smiles_list: list of str or rdkit.Chem.rdchem.Mol, only str when n_jobs != 1
+    n_jobs: int, number of worker processes for the descriptor calculations, -1 for one per CPU
+    chunksize: int, number of SMILES strings sent to a worker at a time
+
+  Returns:
+    scores: np.ndarray of float, 0.0 for invalid SMILES
+
+  """
+  if n_jobs != 1:
+    # each worker scores its chunks through this function with n_jobs=1
+    return np.array(score_smiles_parallel(smiles_list, 'valsartan_smarts', n_jobs=n_jobs, chunksize=chunksize), dtype=float)
+  mols = [_to_mol(smiles) for smiles in smiles_list]
+  # the geometric mean is 0 without the substructure, only hits get descriptors
+  hits = [i for i, mol in enumerate(mols) if mol is not None and mol.HasSubstructMatch(valsartan_mol, useChirality=False)]
+  scores = np.zeros(len(mols))
+  if hits:
+    logp_scores = valsartan_logp_modifier.batch([_logp_of(smiles_list[i], mols[i]) for i in hits])
+    tpsa_scores = valsartan_tpsa_modifier.batch([_tpsa_of(smiles_list[i], mols[i]) for i in hits])
+    bertz_scores = valsartan_bertz_modifier.batch([Descriptors.BertzCT(mols[i]) for i in hits])
+    # smarts_score is 1.0 for every hit
+    scores[hits] = (tpsa_scores * logp_scores * bertz_scores) ** 0.25
+  return scores
+
+valsartan_smarts.batch = valsartan_smarts_batch
+
 ###########################################################################
 ###               END of Guacamol
 ###########################################################################
@@ -1267,9 +1762,10 @@ def tree_analysis(current):
         num_child = 0
         depth += 0.5
         temp = []
-        for i, item in enumerate(current):
-            num_child += len(item['children'])
-            temp = temp + item['children']
+        for item in current:
+            children = item['children']
+            num_child += len(children)
+            temp.extend(children)
         if num_child == 0:
             break
         if depth % 1 != 0:
@@ -1292,6 +1788,36 @@ def tree_analysis(current):
     return num_path, status, depth, p_score*synthesizability, synthesizability, price
 
 
+# retrosynthesis results are persisted in the TDC query cache, keyed by canonical SMILES and request parameters
+def _retro_cache_key(*parts):
+    return json.dumps(parts, sort_keys=True)
+
+def _retro_cache_get(namespace, key):
+    value = _cache_get(namespace, [key]).get(key)
+    return None if value is None else json.loads(value)
+
+def _retro_cache_put(namespace, key, result):
+    _cache_put(namespace, {key: json.dumps(result)})
+
+# pooled keep-alive session shared by all askcos calls, created on first use
+_ASKCOS_SESSION = None
+
+def _askcos_session(num_trials=5):
+    global _ASKCOS_SESSION
+    if _ASKCOS_SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        session = requests.Session()
+        # connection-level failures and 5xx responses are retried here, 
+        # tree builder error payloads are retried by askcos itself
+        adapter = HTTPAdapter(pool_maxsize=32, max_retries=Retry(total=num_trials, backoff_factor=0.5, 
+                                                                 status_forcelist=[500, 502, 503, 504]))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _ASKCOS_SESSION = session
+    return _ASKCOS_SESSION
+
 def askcos(smiles, host_ip, output='plausibility', save_json=False, file_name='tree_builder_result.json', num_trials=5,
            max_depth=9, max_branching=25, expansion_time=60, max_ppg=100, template_count=1000, max_cum_prob=0.999, 
            chemical_property_logic='none', max_chemprop_c=0, max_chemprop_n=0, max_chemprop_o=0, max_chemprop_h=0, 
@@ -1304,49 +1830,57 @@ def askcos(smiles, host_ip, output='plausibility', save_json=False, file_name='t
     if output not in ['num_step', 'plausibility', 'synthesizability', 'price']:
         raise NameError("This output value is not implemented. Please select one from 'num_step', 'plausibility', 'synthesizability', 'price'.")
     
-    import json, requests
-    
-    params = {
-        'smiles': smiles
+    # Parameters for Tree Builder
+    tree_params = {
+        'smiles': smiles, 
+
+        # optional
+        'max_depth': max_depth,
+        'max_branching': max_branching,
+        'expansion_time': expansion_time,
+        'max_ppg': max_ppg,
+        'template_count': template_count,
+        'max_cum_prob': max_cum_prob,
+        'chemical_property_logic': chemical_property_logic,
+        'max_chemprop_c': max_chemprop_c,
+        'max_chemprop_n': max_chemprop_n,
+        'max_chemprop_o': max_chemprop_o,
+        'max_chemprop_h': max_chemprop_h,
+        'chemical_popularity_logic': chemical_popularity_logic,
+        'min_chempop_reactants': min_chempop_reactants,
+        'min_chempop_products': min_chempop_products,
+        'filter_threshold': filter_threshold,
+        'return_first': return_first
     }
-    resp = requests.get(host_ip+'/api/price/', params=params, verify=False)
+    cache_key = _retro_cache_key(host_ip, dict(tree_params, smiles=canonicalize(smiles) or smiles))
+    result = _retro_cache_get('askcos', cache_key)
+
+    if result is None:
+        session = _askcos_session(num_trials)
 
-    if resp.json()['price'] == 0:
-        # Parameters for Tree Builder
         params = {
-            'smiles': smiles, 
-
-            # optional
-            'max_depth': max_depth,
-            'max_branching': max_branching,
-            'expansion_time': expansion_time,
-            'max_ppg': max_ppg,
-            'template_count': template_count,
-            'max_cum_prob': max_cum_prob,
-            'chemical_property_logic': chemical_property_logic,
-            'max_chemprop_c': max_chemprop_c,
-            'max_chemprop_n': max_chemprop_n,
-            'max_chemprop_o': max_chemprop_o,
-            'max_chemprop_h': max_chemprop_h,
-            'chemical_popularity_logic': chemical_popularity_logic,
-            'min_chempop_reactants': min_chempop_reactants,
-            'min_chempop_products': min_chempop_products,
-            'filter_threshold': filter_threshold,
-            'return_first': return_first
+            'smiles': smiles
         }
-
-        # For each entry, repeat to test up to num_trials times if got error message
-        for _ in range(num_trials):
-            print('Trying to send the request, for the %i times now' % (_ + 1))
-            resp = requests.get(host_ip + '/api/treebuilder/', params=params, verify=False)
-            if 'error' not in resp.json().keys():
-                break
+        resp = session.get(host_ip+'/api/price/', params=params, verify=False)
+        result = resp.json()
+
+        if result['price'] == 0:
+            # For each entry, repeat to test up to num_trials times if got error message
+            for _ in range(num_trials):
+                print('Trying to send the request, for the %i times now' % (_ + 1))
+                resp = session.get(host_ip + '/api/treebuilder/', params=tree_params, verify=False)
+                result = resp.json()
+                if 'error' not in result.keys():
+                    break
+
+        if 'error' not in result.keys():
+            _retro_cache_put('askcos', cache_key, result)
                 
     if save_json:
         with open(file_name, 'w') as f_data:
-            json.dump(resp.json(), f_data)
+            json.dump(result, f_data)
         
-    num_path, status, depth, p_score, synthesizability, price = tree_analysis(resp.json())
+    num_path, status, depth, p_score, synthesizability, price = tree_analysis(result)
     
     if output == 'plausibility':
         return p_score
@@ -1357,6 +1891,22 @@ def askcos(smiles, host_ip, output='plausibility', save_json=False, file_name='t
     elif output == 'price':
         return price
 
+def askcos_batch(smiles_list, host_ip, max_workers=32, **kwargs):
+    """
+    Run the ASKCOS oracle on a list of SMILES strings with concurrent requests.
+
+    Args:
+        smiles_list: list of SMILES strings.
+        host_ip: address of the ASKCOS server.
+        max_workers: number of requests in flight at a time.
+        **kwargs: keyword arguments of askcos, save_json needs a distinct file_name per call so it is best left off.
+
+    Returns:
+        A list of askcos outputs, in the order of smiles_list.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(partial(askcos, host_ip=host_ip, **kwargs), smiles_list))
+
 def ibm_rxn(smiles, api_key, output='confidence', sleep_time=30):
     """
     This function is modified from Dr. Jan Jensen's code
@@ -1367,15 +1917,22 @@ def ibm_rxn(smiles, api_key, output='confidence', sleep_time=30):
       print_sys("Please install rxn4chemistry via pip install rxn4chemistry")
     import time
     
-    rxn4chemistry_wrapper = RXN4ChemistryWrapper(api_key=api_key)
-    response = rxn4chemistry_wrapper.create_project('test')
-    time.sleep(sleep_time)
-    response = rxn4chemistry_wrapper.predict_automatic_retrosynthesis(product=smiles)
-    status = ''
-    while status != 'SUCCESS':
+    cache_key = _retro_cache_key(canonicalize(smiles) or smiles)
+    results = _retro_cache_get('ibm_rxn', cache_key)
+    if results is None:
+        rxn4chemistry_wrapper = RXN4ChemistryWrapper(api_key=api_key)
+        response = rxn4chemistry_wrapper.create_project('test')
         time.sleep(sleep_time)
-        results = rxn4chemistry_wrapper.get_predict_automatic_retrosynthesis_results(response['prediction_id'])
-        status = results['status']
+        response = rxn4chemistry_wrapper.predict_automatic_retrosynthesis(product=smiles)
+        status = ''
+        # poll with exponential backoff, capped at sleep_time
+        delay = 2
+        while status != 'SUCCESS':
+            time.sleep(min(delay, sleep_time))
+            delay = min(sleep_time, delay * 1.5)
+            results = rxn4chemistry_wrapper.get_predict_automatic_retrosynthesis_results(response['prediction_id'])
+            status = results['status']
+        _retro_cache_put('ibm_rxn', cache_key, results)
 
     if output == 'confidence':
         return results['retrosynthetic_paths'][0]['confidence']
@@ -1384,6 +1941,22 @@ def ibm_rxn(smiles, api_key, output='confidence', sleep_time=30):
     else:
         raise NameError("This output value is not implemented.")
 
+def ibm_rxn_batch(smiles_list, api_key, max_workers=8, **kwargs):
+    """
+    Run the IBM RXN oracle on a list of SMILES strings, polling the predictions concurrently.
+
+    Args:
+        smiles_list: list of SMILES strings.
+        api_key: IBM RXN API key.
+        max_workers: number of predictions in flight at a time, keep it within the API rate limit.
+        **kwargs: keyword arguments of ibm_rxn.
+
+    Returns:
+        A list of ibm_rxn outputs, in the order of smiles_list.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(partial(ibm_rxn, api_key=api_key, **kwargs), smiles_list))
+
 class molecule_one_retro:
 
     def __init__(self, api_token):
@@ -1403,6 +1976,14 @@ class molecule_one_retro:
       if isinstance(smiles, str):
           smiles = [smiles]
 
+      # only molecules without a stored result are searched
+      keys = {target: _retro_cache_key(canonicalize(target) or target) for target in smiles}
+      cached = _cache_get('molecule_one', list(set(keys.values())))
+      results = {target: json.loads(cached[key]) for target, key in keys.items() if key in cached}
+      smiles = [target for target in smiles if target not in results]
+      if not smiles:
+          return results
+
       search = self.m1wrapper.run_batch_search(
           targets=smiles,
           parameters={'exploratory_search': False, 'detail_level': 'score'}
@@ -1411,8 +1992,11 @@ class molecule_one_retro:
       status_cur = search.get_status()
       print_sys('Started Querying...')
       print_sys(status_cur)
+      # poll with exponential backoff, capped at 30 seconds
+      delay = 2
       while True:
-          time.sleep(7)
+          time.sleep(delay)
+          delay = min(30, delay * 1.5)
           status = search.get_status()
 
           if (status['queued'] == 0) and (status['running'] == 0):
@@ -1423,7 +2007,10 @@ class molecule_one_retro:
                   print_sys(status)
           status_cur = status
       result = search.get_results(precision=5, only=["targetSmiles", "result"])
-      return {i['targetSmiles']: i['result'] for i in result}
+      searched = {i['targetSmiles']: i['result'] for i in result}
+      _cache_put('molecule_one', {keys[target]: json.dumps(value) for target, value in searched.items() if target in keys})
+      results.update(searched)
+      return results
 
 class PyScreener_meta:
     """Evaluate docking score 
@@ -4,7 +4,7 @@
 
 import pandas as pd
 import numpy as np
-import os, sys, json 
+import os, sys
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -60,7 +60,7 @@ class DataLoader(base_dataset.DataLoader):
 		    AttributeError: Use the correct format as input (df, dict)
 		"""
 		if format == 'df':
-			return pd.DataFrame({'smiles': self.smiles_lst})
+			return pd.DataFrame({'smiles': self.smiles_lst}, copy = False)
 		elif format == 'dict':
 			return {'smiles': self.smiles_lst} 
 		else:
@@ -139,7 +139,7 @@ class PairedDataLoader(base_dataset.DataLoader):
 		    AttributeError: Use the correct format as input (df, dict)
 		"""
 		if format == 'df':
-			return pd.DataFrame({'input': self.input_smiles_lst, 'output':self.output_smiles_lst})
+			return pd.DataFrame({'input': self.input_smiles_lst, 'output':self.output_smiles_lst}, copy = False)
 		elif format == 'dict':
 			return {'input': self.input_smiles_lst, 'output':self.output_smiles_lst} 
 		else:
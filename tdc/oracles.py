@@ -449,9 +449,14 @@ class Oracle:
 
 			#### evaluator for single molecule, 
 			#### the input of __call__ is a single smiles OR list of smiles
+			#### evaluators with a batch method score the whole list in one call when there are no extra arguments
+			use_batch = len(args) == 1 and not kwargs
 			if isinstance(self.evaluator_func, dict):
 				all_ = {}
 				for i, fct in self.evaluator_func.items():
+					if use_batch and hasattr(fct, 'batch'):
+						all_[i] = [float(score) for score in fct.batch(smiles_lst)]
+						continue
 					results_lst = []
 					for smiles in smiles_lst:
 						results_lst.append(fct(smiles, *(args[1:]), **kwargs))
@@ -460,7 +465,9 @@ class Oracle:
 			else:
 				results_lst = []
 
-				if not self.name == 'docking_score':
+				if use_batch and hasattr(self.evaluator_func, 'batch'):
+					results_lst = [self.normalize(float(score)) for score in self.evaluator_func.batch(smiles_lst)]
+				elif not self.name == 'docking_score':
 					for smiles in smiles_lst:
 						results_lst.append(self.normalize(self.evaluator_func(smiles, *(args[1:]), **kwargs)))
 				else:
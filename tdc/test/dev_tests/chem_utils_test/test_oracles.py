@@ -31,6 +31,92 @@ class TestOracle(unittest.TestCase):
         x = oracle(['CC(=O)OC1=CC=CC=C1C(=O)O',
                 'C1=CC=C(C=C1)C=O'])
 
+    def test_Oracle_list_batch(self):
+        from tdc import Oracle
+        smiles_lst = ['CC(C)(C)[C@H]1CCc2c(sc(NC(=O)COc3ccc(Cl)cc3)c2C(N)=O)C1', \
+                'invalid', \
+                'CCCCC(=O)N(Cc1ccc(cc1)-c1ccccc1-c1nn[nH]n1)C(C(C)C)C(O)=O', \
+                'CCCOc1cc2ncnc(Nc3ccc4ncsc4c3)c2cc1S(=O)(=O)C(C)(C)C']
+        for name in ['drd2', 'gsk3b', 'jnk3', 'celecoxib_rediscovery', 'aripiprazole_similarity', \
+                'deco_hop', 'scaffold_hop', 'valsartan_smarts']:
+            oracle = Oracle(name = name)
+            # list calls go through .batch, which has to apply normalize like single calls do
+            oracle.normalize = lambda x: 2 * x - 1
+            scores = oracle(smiles_lst)
+            self.assertEqual(len(scores), len(smiles_lst))
+            for smiles, score in zip(smiles_lst, scores):
+                self.assertAlmostEqual(oracle(smiles), score)
+
+    def test_similarity_batch(self):
+        from tdc.chem_utils import celecoxib_rediscovery, aripiprazole_similarity, deco_hop, scaffold_hop
+        smiles_lst = ['CC(C)(C)[C@H]1CCc2c(sc(NC(=O)COc3ccc(Cl)cc3)c2C(N)=O)C1', \
+                'CCNC(=O)c1ccc(NC(=O)N2CC[C@H](C)[C@H](O)C2)c(C)c1', \
+                'CCCOc1cc2ncnc(Nc3ccc4ncsc4c3)c2cc1S(=O)(=O)C(C)(C)C']
+        for oracle in [celecoxib_rediscovery, aripiprazole_similarity, deco_hop, scaffold_hop]:
+            scores = oracle.batch(smiles_lst + ['invalid'])
+            self.assertEqual(len(scores), len(smiles_lst) + 1)
+            self.assertEqual(scores[-1], 0.0)
+            for smiles, score in zip(smiles_lst, scores):
+                self.assertAlmostEqual(oracle(smiles), score)
+
+    def test_valsartan_smarts_batch(self):
+        from tdc.chem_utils import valsartan_smarts
+        # valsartan matches the SMARTS target, the others do not
+        smiles_lst = ['CCCCC(=O)N(Cc1ccc(cc1)-c1ccccc1-c1nn[nH]n1)C(C(C)C)C(O)=O', \
+                'CCNC(=O)c1ccc(NC(=O)N2CC[C@H](C)[C@H](O)C2)c(C)c1', 'CCO']
+        for n_jobs in [1, 2]:
+            scores = valsartan_smarts.batch(smiles_lst + ['invalid'], n_jobs=n_jobs)
+            self.assertEqual(len(scores), len(smiles_lst) + 1)
+            self.assertEqual(scores[-1], 0.0)
+            for smiles, score in zip(smiles_lst, scores):
+                self.assertAlmostEqual(valsartan_smarts(smiles), score)
+
+    def test_predict_proba_batch(self):
+        import numpy as np
+        from tdc.chem_utils.oracle.oracle import _predict_proba_batch, _morgan_bitvect_features, _to_mol
+
+        class StubClassifier:
+            # positive probability from the number of set bits, so every molecule scores differently
+            def predict_proba(self, X):
+                p = np.asarray(X, dtype=float).sum(axis=1) / 2048.
+                return np.stack([1. - p, p], axis=1)
+
+        model = StubClassifier()
+        smiles_lst = ['invalid', 'CC(C)(C)[C@H]1CCc2c(sc(NC(=O)COc3ccc(Cl)cc3)c2C(N)=O)C1', \
+                'invalid', 'CCNC(=O)c1ccc(NC(=O)N2CC[C@H](C)[C@H](O)C2)c(C)c1', 'CCO']
+        scores = _predict_proba_batch(model, smiles_lst)
+        self.assertEqual(len(scores), len(smiles_lst))
+        for smiles, score in zip(smiles_lst, scores):
+            mol = _to_mol(smiles)
+            if mol is None:
+                self.assertEqual(score, 0.0)
+            else:
+                self.assertAlmostEqual(model.predict_proba(_morgan_bitvect_features(mol))[0, 1], score)
+        self.assertEqual(len(_predict_proba_batch(model, [])), 0)
+
+    def test_smiles_to_rdkit_mol_fresh(self):
+        from rdkit import Chem
+        from tdc.chem_utils import celecoxib_rediscovery
+        from tdc.chem_utils.oracle.oracle import smiles_to_rdkit_mol
+        smiles = 'O=C(O)c1ccc2ccccc2c1'
+        score = celecoxib_rediscovery(smiles)
+        mol = smiles_to_rdkit_mol(smiles)
+        self.assertIsNot(mol, smiles_to_rdkit_mol(smiles))
+        # mutating a returned mol must not leak into the oracle caches
+        Chem.Kekulize(mol, clearAromaticFlags=True)
+        self.assertAlmostEqual(celecoxib_rediscovery(smiles), score)
+
+    def test_smiles_2_fingerprint_fresh(self):
+        from tdc.chem_utils import celecoxib_rediscovery
+        from tdc.chem_utils.oracle.oracle import smiles_2_fingerprint_ECFP4
+        smiles = 'O=C(O)c1ccc2ccccc2c1'
+        score = celecoxib_rediscovery(smiles)
+        fp = smiles_2_fingerprint_ECFP4(smiles)
+        self.assertIsNot(fp, smiles_2_fingerprint_ECFP4(smiles))
+        # accumulating into a returned fingerprint must not leak into the oracle caches
+        fp += smiles_2_fingerprint_ECFP4('CCO')
+        self.assertAlmostEqual(celecoxib_rediscovery(smiles), score)
+
     def test_distribution(self):
         from tdc import Evaluator
         evaluator = Evaluator(name = 'Diversity')
@@ -46,6 +46,49 @@ class TestFunctions(unittest.TestCase):
         from tdc.utils import cid2smiles
         smiles = cid2smiles(2248631)
 
+    def test_cids2smiles(self):
+        from tdc.utils import cids2smiles
+        smiles = cids2smiles([2248631, 2244])
+        self.assertEqual(set(smiles), {2248631, 2244})
+        for value in smiles.values():
+            self.assertIsInstance(value, str)
+            self.assertNotEqual(value, 'NULL')
+
+    def test_smiles_from_property_table(self):
+        from tdc.utils.query import _smiles_from_property_table
+        table = '"CID","CanonicalSMILES"\n2244,"CC(=O)OC1=CC=CC=C1C(=O)O"\n702,"CCO"\n'
+        self.assertEqual(_smiles_from_property_table(table),
+                         {2244: 'CC(=O)OC1=CC=CC=C1C(=O)O', 702: 'CCO'})
+
+    def test_cids2smiles_offline(self):
+        import tempfile
+        from unittest import mock
+        from tdc.utils import query
+        session = mock.Mock()
+        session.post.return_value = mock.Mock(text='"CID","CanonicalSMILES"\n2244,"CC(=O)OC1=CC=CC=C1C(=O)O"\n')
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(query, '_SESSION', session), \
+                mock.patch.object(query, '_CACHE_PATH', os.path.join(tmp, 'query_cache.db')):
+            smiles = query.cids2smiles([2244, '2244', 7])
+            self.assertEqual(smiles, {2244: 'CC(=O)OC1=CC=CC=C1C(=O)O', 7: 'NULL'})
+            # duplicate CIDs are sent once, in a single request
+            self.assertEqual(session.post.call_count, 1)
+            self.assertEqual(session.post.call_args[1]['data'], b'cid=2244,7')
+            # resolved CIDs come from the on-disk cache, unresolved ones are fetched again
+            self.assertEqual(query.cids2smiles([2244]), {2244: 'CC(=O)OC1=CC=CC=C1C(=O)O'})
+            self.assertEqual(session.post.call_count, 1)
+            query.cids2smiles([7])
+            self.assertEqual(session.post.call_count, 2)
+
+    def test_cid2smiles_malformed(self):
+        import tempfile
+        from unittest import mock
+        from tdc.utils import query
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(query, '_CACHE_PATH', os.path.join(tmp, 'query_cache.db')):
+            self.assertEqual(query.cid2smiles('abc'), 'NULL')
+            self.assertEqual(query.cids2smiles(['abc', None]), {'abc': 'NULL', None: 'NULL'})
+
     def test_uniprot2seq(self):
         from tdc.utils import uniprot2seq
         seq = uniprot2seq('P49122')
@@ -26,4 +26,6 @@ from .label import NegSample, label_transform, convert_y_unit, \
 from .retrieve import get_label_map, get_reaction_type,\
 						retrieve_label_name_list, retrieve_dataset_names,\
 						retrieve_all_benchmarks, retrieve_benchmark_names
-from .query import uniprot2seq, cid2smiles
\ No newline at end of file
+from .query import uniprot2seq, cid2smiles, cids2smiles, \
+					cids2smiles_parallel, cid2smiles_bytes, \
+					acid2smiles, cids2smiles_async
\ No newline at end of file
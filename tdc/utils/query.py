@@ -1,29 +1,111 @@
 """Utilities functions for query  
 """
+import csv
+import io
 import json
-import os, sys
+import os, sys, re
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, lru_cache
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 try:
-	from urllib.error import HTTPError
 	from urllib.parse import quote, urlencode
-	from urllib.request import urlopen
 except ImportError:
 	from urllib import urlencode
-	from urllib2 import quote, urlopen, HTTPError
+	from urllib2 import quote
+try:
+	from orjson import loads as _json_loads
+except ImportError:
+	_json_loads = json.loads
+try:
+	import ijson
+except ImportError:
+	ijson = None
+
+# persistent session so repeated queries reuse TCP/TLS connections; host names are
+# only resolved when the pool opens a new connection, and the pool is sized above
+# the number of concurrent PubChem requests so idle connections are kept alive
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16,
+									   max_retries=Retry(total=5, backoff_factor=1.0,
+														 status_forcelist=[429, 500, 502, 503, 504],
+														 allowed_methods=frozenset({'GET', 'POST'}))))
+
+_PUBCHEM_API_BASE = 'https://pubchem.ncbi.nlm.nih.gov/rest/pug'
+# namespaces whose identifier goes in the URL path rather than the POST body
+_URLID_NAMESPACES = frozenset({'listkey', 'formula', 'sourceid'})
+# comma-separated CIDs are URL-safe as they are and need no form encoding
+_SAFE_CID = re.compile(r'\A[0-9,]+\Z')
+
+# PubChem throttles clients above ~5 concurrent requests
+_PUBCHEM_SEMAPHORE = threading.Semaphore(5)
+
+# on-disk cache of query results, shared across sessions
+_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'tdc', 'query_cache.db')
+_CACHE_LOCK = threading.Lock()
+
+def _cache_connect():
+	os.makedirs(os.path.dirname(_CACHE_PATH), exist_ok=True)
+	conn = sqlite3.connect(_CACHE_PATH)
+	conn.execute('CREATE TABLE IF NOT EXISTS cache (namespace TEXT, key TEXT, value TEXT, PRIMARY KEY (namespace, key))')
+	return conn
 
-def _parse_prop(search, proplist):
-	"""Extract property value from record using the given urn search filter.
+def _cache_get(namespace, keys):
+	"""Look up keys in the on-disk cache, return a dict of the ones found.
 	"""
-	props = [i for i in proplist if all(item in i['urn'].items() for item in search.items())]
-	if len(props) > 0:
-		return props[0]['value'][list(props[0]['value'].keys())[0]]
+	found = {}
+	try:
+		with _CACHE_LOCK:
+			conn = _cache_connect()
+			try:
+				for key in keys:
+					row = conn.execute('SELECT value FROM cache WHERE namespace = ? AND key = ?', (namespace, str(key))).fetchone()
+					if row is not None:
+						found[key] = row[0]
+			finally:
+				conn.close()
+	except (sqlite3.Error, OSError):
+		pass
+	return found
 
-def request(identifier, namespace='cid', domain='compound', operation=None, output='JSON', searchtype=None):
+def _cache_put(namespace, items):
+	"""Store a dict of key/value pairs in the on-disk cache.
+	"""
+	try:
+		with _CACHE_LOCK:
+			conn = _cache_connect()
+			try:
+				with conn:
+					conn.executemany('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+									 [(namespace, str(key), value) for key, value in items.items()])
+			finally:
+				conn.close()
+	except (sqlite3.Error, OSError):
+		pass
+
+def _make_prop_parser(label, name):
+	"""Build a parser specialized for one (label, name) urn search, with the keys bound as constants.
+	"""
+	def parse(proplist):
+		for i in proplist:
+			urn = i['urn']
+			if urn.get('label') == label and urn.get('name') == name:
+				return next(iter(i['value'].values()))
+		return None
+	return parse
+
+_parse_canonical_smiles = _make_prop_parser('SMILES', 'Canonical')
+
+def request(identifier, namespace='cid', domain='compound', operation=None, output='JSON', searchtype=None, stream=False):
 	"""
 	copied from https://github.com/mcs07/PubChemPy/blob/e3c4f4a9b6120433e5cc3383464c7a79e9b2b86e/pubchempy.py#L238
 	Construct API request from parameters and return the response.
 	Full specification at http://pubchem.ncbi.nlm.nih.gov/pug_rest/PUG_REST.html
 	"""
-	API_BASE = 'https://pubchem.ncbi.nlm.nih.gov/rest/pug'
 	text_types = str, bytes
 	if not identifier:
 		raise ValueError('identifier/cid cannot be None')
@@ -37,18 +119,35 @@ def request(identifier, namespace='cid', domain='compound', operation=None, outp
 	urlid, postdata = None, None
 	if namespace == 'sourceid':
 		identifier = identifier.replace('/', '.')
-	if namespace in ['listkey', 'formula', 'sourceid'] \
-			or searchtype == 'xref' \
+	if namespace in _URLID_NAMESPACES or searchtype == 'xref' \
 			or (searchtype and namespace == 'cid') or domain == 'sources':
 		urlid = quote(identifier.encode('utf8'))
+	elif namespace == 'cid' and isinstance(identifier, str) and _SAFE_CID.match(identifier):
+		postdata = f'{namespace}={identifier}'.encode('ascii')
 	else:
 		postdata = urlencode([(namespace, identifier)]).encode('utf8')
-	comps = filter(None, [API_BASE, domain, searchtype, namespace, urlid, operation, output])
-	apiurl = '/'.join(comps)
+	apiurl = (f'{_PUBCHEM_API_BASE}/{domain}'
+			  + (f'/{searchtype}' if searchtype else '')
+			  + (f'/{namespace}' if namespace else '')
+			  + (f'/{urlid}' if urlid else '')
+			  + (f'/{operation}' if operation else '')
+			  + (f'/{output}' if output else ''))
 	# Make request
-	response = urlopen(apiurl, postdata)
+	if postdata:
+		response = _SESSION.post(apiurl, data=postdata, timeout=30, stream=stream,
+			headers={'Content-Type': 'application/x-www-form-urlencoded'})
+	else:
+		response = _SESSION.get(apiurl, timeout=30, stream=stream)
+	response.raise_for_status()
 	return response
 
+async def arequest(identifier, *args, **kwargs):
+	"""Awaitable variant of :func:`request`, run in the default executor so many lookups can be gathered.
+	"""
+	loop = asyncio.get_running_loop()
+	return await loop.run_in_executor(None, partial(request, identifier, *args, **kwargs))
+
+@lru_cache(maxsize=None)
 def uniprot2seq(ProteinID):
 	"""Get protein sequence from Uniprot ID
 	
@@ -58,18 +157,116 @@ def uniprot2seq(ProteinID):
 	Returns:
 	    str: amino acid sequence
 	"""
-	import urllib
-	import string
-	import urllib.request as ur
-
 	ID = str(ProteinID)
-	localfile = ur.urlopen('http://www.uniprot.org/uniprot/' + ID + '.fasta')
-	temp = localfile.readlines()
-	res = ''
-	for i in range(1, len(temp)):
-		res = res + temp[i].strip().decode("utf-8")
+	cached = _cache_get('uniprot', [ID])
+	if ID in cached:
+		return cached[ID]
+	response = _SESSION.get('https://rest.uniprot.org/uniprotkb/' + ID + '.fasta', timeout=30)
+	response.raise_for_status()
+	# drop the FASTA header line, the rest is the wrapped sequence
+	res = response.content.partition(b'\n')[2].translate(None, b'\r\n').decode('ascii')
+	_cache_put('uniprot', {ID: res})
 	return res
 
+def _smiles_from_compounds(compounds):
+	"""Map each record of a PubChem PC_Compounds array to its canonical SMILES.
+	"""
+	return {record['id']['id']['cid']: _parse_canonical_smiles(record['props']) for record in compounds}
+
+def _smiles_from_property_table(text):
+	"""Map each row of a PubChem property table (CSV with CID and SMILES columns) to its SMILES.
+	"""
+	rows = csv.reader(io.StringIO(text))
+	next(rows, None)  # skip the header
+	return {int(row[0]): row[1] for row in rows if len(row) > 1}
+
+def _fetch_smiles_chunk(cids):
+	"""Fetch the SMILES strings of one chunk of CIDs with a single request.
+	"""
+	try:
+		with _PUBCHEM_SEMAPHORE:
+			try:
+				# the property table carries just the SMILES, not the ~5KB full record
+				response = request(cids, operation='property/CanonicalSMILES', output='CSV')
+				return _smiles_from_property_table(response.text)
+			except requests.exceptions.HTTPError as e:
+				if e.response is None or not 400 <= e.response.status_code < 500:
+					raise
+				# property rejected by the server, fall back to parsing the full records
+				if ijson is not None:
+					# stream one record at a time instead of building the whole payload
+					with request(cids, stream=True) as response:
+						response.raw.decode_content = True
+						return _smiles_from_compounds(ijson.items(response.raw, 'PC_Compounds.item'))
+				compounds = _json_loads(request(cids).content)['PC_Compounds']
+		return _smiles_from_compounds(compounds)
+	except requests.exceptions.RequestException as e:
+		print('cids ' + ','.join(str(cid) for cid in cids) + ' failed after retries (' + str(e) + '), use NULL string')
+	except (KeyError, IndexError):
+		print('cids ' + ','.join(str(cid) for cid in cids) + ' returned no SMILES, use NULL string')
+	except Exception as e:
+		print('cids ' + ','.join(str(cid) for cid in cids) + ' failed (' + repr(e) + '), use NULL string')
+	return {}
+
+def _normalize_cid(cid):
+	"""Return the CID as an int, None if it is not a valid identifier.
+	"""
+	try:
+		return int(cid)
+	except (ValueError, TypeError):
+		print('cid ' + str(cid) + ' is not a valid CID, use NULL string')
+		return None
+
+def _cids2smiles(cids, chunk, map_func):
+	"""Resolve CIDs from the on-disk cache, fetching the misses chunk by chunk with map_func.
+	"""
+	# malformed CIDs keep their original key and map to NULL
+	normalized = [(cid, _normalize_cid(cid)) for cid in cids]
+	valid = [n for _, n in normalized if n is not None]
+	results = _cache_get('pubchem_smiles', valid)
+	missing = list(dict.fromkeys(cid for cid in valid if cid not in results))
+	batches = [missing[i:i + chunk] for i in range(0, len(missing), chunk)]
+	fetched = {}
+	for batch_results in map_func(_fetch_smiles_chunk, batches):
+		fetched.update({cid: smiles for cid, smiles in batch_results.items() if smiles is not None})
+	_cache_put('pubchem_smiles', fetched)
+	results.update(fetched)
+	return {cid if n is None else n: results.get(n, 'NULL') for cid, n in normalized}
+
+def cids2smiles(cids, chunk=200):
+	"""SMILES strings from a list of PubChem CIDs, fetched in batched requests
+	
+	Args:
+	    cids (list): PubChem CIDs
+	    chunk (int, optional): number of CIDs sent per request (PUG-REST accepts up to ~200)
+	
+	Returns:
+	    dict: a dictionary mapping each CID (int) to its SMILES string
+	"""
+	return _cids2smiles(cids, chunk, map)
+
+def cids2smiles_parallel(cids, workers=8, chunk=200):
+	"""SMILES strings from a list of PubChem CIDs, with the batched requests issued concurrently
+	
+	Args:
+	    cids (list): PubChem CIDs
+	    workers (int, optional): number of threads sending requests
+	    chunk (int, optional): number of CIDs sent per request
+	
+	Returns:
+	    dict: a dictionary mapping each CID (int) to its SMILES string
+	"""
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		return _cids2smiles(cids, chunk, executor.map)
+
+@lru_cache(maxsize=None)
+def _cached_cid2smiles(cid):
+	smiles = cids2smiles([cid])[cid]
+	if smiles == 'NULL':
+		# raise so that failed lookups are not memoized
+		raise LookupError(cid)
+	return smiles
+
 def cid2smiles(cid):
 	"""SMILES string from PubChem CID 
 	
@@ -79,9 +276,56 @@ def cid2smiles(cid):
 	Returns:
 	    str: SMILES string
 	"""
+	cid = _normalize_cid(cid)
+	if cid is None:
+		return 'NULL'
 	try:
-		smiles = _parse_prop({'label': 'SMILES', 'name': 'Canonical'}, json.loads(request(cid).read().decode())['PC_Compounds'][0]['props'])
-	except:
-		print('cid ' + str(cid) + ' failed, use NULL string')
-		smiles = 'NULL'
-	return smiles
+		return _cached_cid2smiles(cid)
+	except LookupError:
+		return 'NULL'
+
+async def acid2smiles(cid):
+	"""Awaitable variant of :func:`cid2smiles`
+	
+	Args:
+	    cid (str): PubChem CID
+	
+	Returns:
+	    str: SMILES string
+	"""
+	loop = asyncio.get_running_loop()
+	return await loop.run_in_executor(None, cid2smiles, cid)
+
+async def cids2smiles_async(cids):
+	"""SMILES strings from a list of PubChem CIDs, with one concurrent lookup per CID
+	
+	Args:
+	    cids (list): PubChem CIDs
+	
+	Returns:
+	    dict: a dictionary mapping each CID (int) to its SMILES string
+	"""
+	normalized = [(cid, _normalize_cid(cid)) for cid in cids]
+	valid = [n for _, n in normalized if n is not None]
+	smiles = dict(zip(valid, await asyncio.gather(*(acid2smiles(cid) for cid in valid))))
+	return {cid if n is None else n: smiles.get(n, 'NULL') for cid, n in normalized}
+
+def cid2smiles_bytes(cid):
+	"""SMILES string from PubChem CID as raw bytes, e.g. to feed RDKit without a str round trip
+	
+	Args:
+	    cid (str): PubChem CID
+	
+	Returns:
+	    bytes: SMILES string
+	"""
+	cid = _normalize_cid(cid)
+	if cid is None:
+		return b'NULL'
+	try:
+		# the plain-text property endpoint returns only the SMILES, no JSON to decode
+		with _PUBCHEM_SEMAPHORE:
+			return request(cid, operation='property/CanonicalSMILES', output='TXT').content.strip()
+	except requests.exceptions.RequestException as e:
+		print('cid ' + str(cid) + ' failed after retries (' + str(e) + '), use NULL string')
+		return b'NULL'